@@ -6,15 +6,20 @@ Author: Member 3 (Backend Lead)
 
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import os
 import shutil
 
 # Import Member 1 & 2's work
 from ml_engine.nlp.pipeline import process_voice_note
+from ml_engine.nlp.transcribe import POLICY as WHISPER_POLICY
 from ml_engine.inference import predict_priority_score
 
 # Import Member 3's work
-from backend.database.auth import register_user, get_user_by_token
+from backend.database.async_db import register_user, get_user_by_token, shutdown as stop_db_threads
+from backend.database.models import init_db
+from backend.database.connection import close_all as close_db_connections
+from backend.database.vitals_buffer import vitals_buffer
 from backend.utils.qr_generator import generate_emergency_qr
 from backend.app.routers import triage, appointments, vitals  # Original routers
 from backend.app.routers import history, profile, doctor, maps  # New routers
@@ -30,6 +35,17 @@ app.include_router(profile.router)
 app.include_router(doctor.router)
 app.include_router(maps.router)
 
+# Create tables / apply column migrations before serving requests
+@app.on_event("startup")
+async def startup():
+    init_db()
+
+@app.on_event("shutdown")
+async def shutdown():
+    stop_db_threads()
+    vitals_buffer.stop()  # Commit queued vitals before the connections go
+    close_db_connections()
+
 # Enable CORS so the Mobile App (React Native/Flutter) can connect
 app.add_middleware(
     CORSMiddleware,
@@ -41,7 +57,7 @@ app.add_middleware(
 # --- ENDPOINT 1: USER REGISTRATION ---
 @app.post("/register")
 async def register(name: str, age: int, blood_type: str, allergies: str, conditions: str, contact: str):
-    token = register_user(name, age, blood_type, allergies, conditions, contact)
+    token = await register_user(name, age, blood_type, allergies, conditions, contact)
     if token:
         qr_path = generate_emergency_qr(token)
         return {"status": "success", "token": token, "qr_code_ready": True}
@@ -50,7 +66,7 @@ async def register(name: str, age: int, blood_type: str, allergies: str, conditi
 # --- ENDPOINT 2: EMERGENCY QR LOOKUP ---
 @app.get("/emergency/{token}")
 async def emergency_lookup(token: str):
-    user = get_user_by_token(token)
+    user = await get_user_by_token(token)
     if user:
         return {"mode": "EMERGENCY_ACCESS", "data": user}
     raise HTTPException(status_code=404, detail="User not found")
@@ -62,9 +78,11 @@ async def triage_voice(file: UploadFile = File(...)):
     with open(temp_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
     
+    # Counted as waiting for Whisper from now; the pipeline runs off the event loop
+    arrival = WHISPER_POLICY.arrive()
     try:
         # Process through Member 2's NLP Pipeline
-        nlp_result = process_voice_note(temp_path)
+        nlp_result = await run_in_threadpool(process_voice_note, temp_path, arrival=arrival)
         
         # Process through Member 1's ML Inference
         # Defaulting age to 30 for the voice-only demo
@@ -75,6 +93,7 @@ async def triage_voice(file: UploadFile = File(...)):
             "analysis": ml_result
         }
     finally:
+        WHISPER_POLICY.leave(arrival)
         if os.path.exists(temp_path):
             os.remove(temp_path)
 
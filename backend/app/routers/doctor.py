@@ -4,26 +4,16 @@ Role: Doctor Dashboard API — Patient list sorted by urgency
 Author: Member 3 (Backend Lead)
 """
 
-import sqlite3
 from fastapi import APIRouter, Depends
-from backend.database.models import DB_PATH
+from backend.database.async_db import run_db
+from backend.database.connection import get_connection
 from backend.app.routers.auth_dep import get_current_user
 
 router = APIRouter(prefix="/doctor", tags=["Doctor"])
 
 
-@router.get("/patients")
-async def get_patients(user: dict = Depends(get_current_user)):
-    """
-    Returns all registered patients sorted by their latest heart rate
-    (descending — higher BPM = higher urgency).
-
-    Each patient includes: id, name, age, blood_type, chronic_conditions,
-    latest_bpm, latest_vital_time, urgency_score (derived).
-    """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+def _fetch_patients():
+    cursor = get_connection().cursor()
 
     # Left-join users with their latest vital reading
     # Urgency score: BPM deviation from normal (72) + age factor
@@ -47,10 +37,20 @@ async def get_patients(user: dict = Depends(get_current_user)):
         ORDER BY v.bpm DESC NULLS LAST
         """
     )
+    return [dict(row) for row in cursor.fetchall()]
+
 
-    patients = []
-    for row in cursor.fetchall():
-        p = dict(row)
+@router.get("/patients")
+async def get_patients(user: dict = Depends(get_current_user)):
+    """
+    Returns all registered patients sorted by their latest heart rate
+    (descending — higher BPM = higher urgency).
+
+    Each patient includes: id, name, age, blood_type, chronic_conditions,
+    latest_bpm, latest_vital_time, urgency_score (derived).
+    """
+    patients = await run_db(_fetch_patients)
+    for p in patients:
         # Derive urgency score: abs BPM deviation from 72 + age weight
         bpm = p.get("latest_bpm")
         age = p.get("age") or 30
@@ -59,9 +59,6 @@ async def get_patients(user: dict = Depends(get_current_user)):
         else:
             urgency = 0
         p["urgency_score"] = urgency
-        patients.append(p)
-
-    conn.close()
 
     # Re-sort by urgency_score descending (in case BPM ordering differs)
     patients.sort(key=lambda x: x["urgency_score"], reverse=True)
@@ -4,43 +4,26 @@ Role: Vitals History & Dashboard Stats API
 Author: Member 3 (Backend Lead)
 """
 
-import sqlite3
 from fastapi import APIRouter, Depends
-from backend.database.models import DB_PATH
+from backend.database.async_db import run_db
+from backend.database.connection import get_connection
 from backend.app.routers.auth_dep import get_current_user
 
 router = APIRouter(tags=["History"])
 
 
-@router.get("/vitals/history")
-async def get_vitals_history(user: dict = Depends(get_current_user)):
-    """
-    Returns the user's past vitals records, newest first.
-    Each record includes: id, bpm, timestamp.
-    """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
+def _fetch_history(token):
+    cursor = get_connection().cursor()
     cursor.execute(
         "SELECT id, bpm, timestamp FROM vitals WHERE user_token = ? ORDER BY id DESC LIMIT 50",
-        (user["qr_token"],),
+        (token,),
     )
-    rows = [dict(r) for r in cursor.fetchall()]
-    conn.close()
+    return [dict(r) for r in cursor.fetchall()]
 
-    return {"status": "success", "count": len(rows), "records": rows}
 
-
-@router.get("/dashboard/stats")
-async def get_dashboard_stats(user: dict = Depends(get_current_user)):
-    """
-    Returns calculated averages from the user's vitals records.
-    Includes: avg_bpm, min_bpm, max_bpm, total_readings, latest_bpm.
-    """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+def _fetch_stats(token):
+    """Aggregates, latest reading and the last 50 BPMs (newest first), in one hop to a DB thread."""
+    cursor = get_connection().cursor()
 
     # Aggregate stats
     cursor.execute(
@@ -53,17 +36,45 @@ async def get_dashboard_stats(user: dict = Depends(get_current_user)):
         FROM vitals
         WHERE user_token = ?
         """,
-        (user["qr_token"],),
+        (token,),
     )
     stats = dict(cursor.fetchone())
 
     # Latest reading
     cursor.execute(
         "SELECT bpm, timestamp FROM vitals WHERE user_token = ? ORDER BY id DESC LIMIT 1",
-        (user["qr_token"],),
+        (token,),
     )
     latest = cursor.fetchone()
-    conn.close()
+    latest = dict(latest) if latest else None
+
+    # Fetch last 30 days of vitals (approximated by last 50 records)
+    cursor.execute(
+        "SELECT bpm FROM vitals WHERE user_token = ? ORDER BY id DESC LIMIT 50",
+        (token,),
+    )
+    recent_vitals = [r["bpm"] for r in cursor.fetchall()]
+    return stats, latest, recent_vitals
+
+
+@router.get("/vitals/history")
+async def get_vitals_history(user: dict = Depends(get_current_user)):
+    """
+    Returns the user's past vitals records, newest first.
+    Each record includes: id, bpm, timestamp.
+    """
+    rows = await run_db(_fetch_history, user["qr_token"])
+
+    return {"status": "success", "count": len(rows), "records": rows}
+
+
+@router.get("/dashboard/stats")
+async def get_dashboard_stats(user: dict = Depends(get_current_user)):
+    """
+    Returns calculated averages from the user's vitals records.
+    Includes: avg_bpm, min_bpm, max_bpm, total_readings, latest_bpm.
+    """
+    stats, latest, recent_vitals = await run_db(_fetch_stats, user["qr_token"])
 
     # Round floats for clean JSON
     for key in ("avg_bpm", "min_bpm", "max_bpm"):
@@ -87,13 +98,6 @@ async def get_dashboard_stats(user: dict = Depends(get_current_user)):
 
 
     # 3. Visit Penalty (High Urgency Scans)
-    # Fetch last 30 days of vitals (approximated by last 50 records)
-    cursor.execute(
-        "SELECT bpm FROM vitals WHERE user_token = ? ORDER BY id DESC LIMIT 50",
-        (user["qr_token"],),
-    )
-    recent_vitals = [r["bpm"] for r in cursor.fetchall()]
-    
     # High Urgency Definition: BPM > 100 or BPM < 60
     high_urgency_count = sum(1 for bpm in recent_vitals if bpm > 100 or bpm < 60)
     score -= (high_urgency_count * 5)
@@ -4,30 +4,69 @@ Role: Unified Triage with History & Security
 Author: Member 4 (Coordinator)
 """
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
+import asyncio
 import os
 import shutil
 import uuid
 
 # Import AI work from Members 1 & 2
-from ml_engine.nlp.pipeline import process_voice_note
+from ml_engine.nlp.pipeline import process_voice_note, get_refined_result
+from ml_engine.nlp.transcribe import POLICY as WHISPER_POLICY, LANGUAGE_MIN_PROBABILITY, get_language_stats
 from ml_engine.inference import predict_priority_score
 from backend.app.services.scheduler import calculate_appointment_time
-from backend.database.auth import get_user_by_token
+from backend.app.services.jobs import JobStore, JobStoreFull, FINAL_STATES
+from backend.database.auth import get_user_by_token, set_user_language
 
 router = APIRouter(prefix="/triage", tags=["Triage"])
 TEMP_DIR = "backend/temp_audio"
 MOCK_QUEUE = 4 # Current number of patients in the ER
 
+# Async voice triage: jobs run on this pool, results are kept for JOB_TTL_SECONDS
+JOB_WORKERS = 2
+JOB_TTL_SECONDS = 900
+MAX_JOBS = 500
+JOB_STORE = JobStore(max_jobs=MAX_JOBS, ttl_seconds=JOB_TTL_SECONDS)
+_JOB_EXECUTOR = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="triage-job")
+
+def _save_voice_note(voice_note):
+    """Copies the upload to TEMP_DIR and returns the path (None if no note)."""
+    if not voice_note:
+        return None
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    file_path = os.path.join(TEMP_DIR, f"{uuid.uuid4()}_{voice_note.filename}")
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(voice_note.file, buffer)
+    return file_path
+
 @router.post("/process")
 async def process_triage(
     age: int = Form(...),
     heart_rate: int = Form(72),
     manual_symptoms: Optional[str] = Form(""),
     qr_token: Optional[str] = Form(None), # Added for Phase I Integration
+    language: Optional[str] = Form(None), # Whisper code hint, e.g. "hi"; skips detection
     voice_note: UploadFile = File(None)
 ):
+    file_path = _save_voice_note(voice_note)
+    # Counted as waiting for Whisper from now, and run on the worker pool (not the event loop)
+    arrival = WHISPER_POLICY.arrive() if file_path else None
+    try:
+        return await asyncio.wrap_future(_JOB_EXECUTOR.submit(
+            run_triage, age, heart_rate, manual_symptoms, qr_token, language, file_path, arrival=arrival
+        ))
+    finally:
+        if arrival is not None:
+            WHISPER_POLICY.leave(arrival)
+
+def run_triage(age, heart_rate, manual_symptoms, qr_token, language, file_path, queue_depth=None, arrival=None):
+    """
+    Full triage for one patient. Blocking (Whisper + ML), so both endpoints run
+    it on the worker pool. Deletes `file_path` when done. `arrival` is the
+    WHISPER_POLICY.arrive() handle taken when the request came in.
+    """
     # 1. Initialize symptoms
     final_symptoms = {
         "symptom_chest_pain": 0, "symptom_shortness_of_breath": 0,
@@ -39,10 +78,15 @@ async def process_triage(
     history_bonus = 0
     chronic_conditions = ""
     history_noted = ""
+    stored_language = None
+    registered_user = False
     
     if qr_token:
         user_data = get_user_by_token(qr_token)
         if user_data:
+            registered_user = True
+            stored_language = user_data.get('preferred_language')
+
             chronic_conditions = user_data.get('chronic_conditions', "").lower()
             history_noted = chronic_conditions
             
@@ -70,17 +114,31 @@ async def process_triage(
 
     # 4. Process Voice / NLP (Member 2) [cite: 17, 18]
     transcription = ""
-    if voice_note:
-        file_path = os.path.join(TEMP_DIR, f"{uuid.uuid4()}_{voice_note.filename}")
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(voice_note.file, buffer)
+    model_tier = None
+    result_id = None
+    spoken_language = None
+    language_hinted = False
+    if file_path:
         try:
-            nlp_result = process_voice_note(file_path)
+            # An explicit hint wins; otherwise reuse the patient's last detected language
+            nlp_result = process_voice_note(file_path, queue_depth=queue_depth, language=language or stored_language,
+                                            arrival=arrival)
             # Merge voice-detected symptoms
             for key, value in nlp_result['symptoms'].items():
                 if key in final_symptoms and value == 1:
                     final_symptoms[key] = 1
             transcription = nlp_result.get('transcribed_text', "")
+            model_tier = nlp_result.get('model_tier')
+            spoken_language = nlp_result.get('language')
+            language_hinted = nlp_result.get('language_hinted', False)
+            # Remember the language per patient so the next note skips detection, but only
+            # a confident detection (one noisy note must not pin the wrong language)
+            language_probability = nlp_result.get('language_probability')
+            if registered_user and spoken_language and spoken_language != stored_language \
+                    and language_probability is not None and language_probability >= LANGUAGE_MIN_PROBABILITY:
+                set_user_language(qr_token, spoken_language)
+            if nlp_result.get('refinement_pending'):
+                result_id = nlp_result.get('result_id')
         finally:
             if os.path.exists(file_path):
                 os.remove(file_path)
@@ -117,9 +175,122 @@ async def process_triage(
         "triage": {"score": final_score, "risk": risk_level},
         "analysis": {
             "transcription": transcription,
+            "model_tier": model_tier,
+            "language": spoken_language,
+            "language_hinted": language_hinted,
+            "refined_result_id": result_id,
             "detected_symptoms": [k for k,v in final_symptoms.items() if v == 1],
             "severity": scheduling['severity']
         },
         "appointment": scheduling,
         "history_noted": history_noted
     }
+
+def _run_job(job_id, age, heart_rate, manual_symptoms, qr_token, language, file_path, arrival):
+    JOB_STORE.update(job_id, "running")
+    try:
+        result = run_triage(age, heart_rate, manual_symptoms, qr_token, language, file_path, arrival=arrival)
+        JOB_STORE.update(job_id, "done", result=result)
+    except Exception as e:
+        print(f"❌ Triage Job {job_id} Failed: {e}")
+        JOB_STORE.update(job_id, "failed", error=str(e))
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+    finally:
+        if arrival is not None:
+            WHISPER_POLICY.leave(arrival)
+
+def _job_view(job):
+    return {
+        "job_id": job["job_id"],
+        "state": job["state"],
+        "result": job["result"],
+        "error": job["error"]
+    }
+
+@router.post("/jobs", status_code=202)
+async def submit_triage_job(
+    age: int = Form(...),
+    heart_rate: int = Form(72),
+    manual_symptoms: Optional[str] = Form(""),
+    qr_token: Optional[str] = Form(None),
+    language: Optional[str] = Form(None),
+    voice_note: UploadFile = File(None)
+):
+    """
+    Async version of /triage/process: returns a job id immediately.
+    Poll GET /triage/jobs/{job_id} or subscribe to /triage/jobs/{job_id}/ws.
+    Returns 503 while MAX_JOBS jobs are already queued or running.
+    """
+    # Admission control: the store only evicts finished jobs, so this also bounds the executor queue
+    if JOB_STORE.active_count() >= MAX_JOBS:
+        raise HTTPException(status_code=503, detail="Too many triage jobs in progress, retry later")
+    try:
+        job_id = JOB_STORE.create()
+    except JobStoreFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    file_path = _save_voice_note(voice_note)
+    # Queued jobs count towards the Whisper queue depth used for model tiering
+    arrival = WHISPER_POLICY.arrive() if file_path else None
+    _JOB_EXECUTOR.submit(_run_job, job_id, age, heart_rate, manual_symptoms, qr_token, language, file_path, arrival)
+    return {
+        "status": "accepted",
+        "job_id": job_id,
+        "status_url": f"/triage/jobs/{job_id}",
+        "ws_url": f"/triage/jobs/{job_id}/ws"
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_triage_job(job_id: str):
+    """Returns the job state (queued/running/done/failed) and its result once done."""
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id")
+    return _job_view(job)
+
+@router.websocket("/jobs/{job_id}/ws")
+async def triage_job_ws(websocket: WebSocket, job_id: str):
+    """Sends the current job state, then the final state once the job finishes."""
+    await websocket.accept()
+    try:
+        job = JOB_STORE.get(job_id)
+        if job is None:
+            await websocket.close(code=4004)
+            return
+        await websocket.send_json(_job_view(job))
+        if job["state"] not in FINAL_STATES:
+            job = await JOB_STORE.wait(job_id, timeout=JOB_TTL_SECONDS)
+            if job is None:
+                await websocket.close(code=4004)
+                return
+            await websocket.send_json(_job_view(job))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/refined/{result_id}")
+async def get_refined_transcription(result_id: str):
+    """
+    Returns the largest-tier re-transcription of a voice note that was first
+    served by a smaller Whisper model under load. "dropped" means the upgrade
+    was skipped because the Whisper backlog stayed full.
+    """
+    refined = get_refined_result(result_id)
+    if refined is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired result id")
+    if refined["status"] in ("pending", "dropped"):
+        return {"status": refined["status"]}
+    return {
+        "status": "complete",
+        "transcription": refined["transcribed_text"],
+        "model_tier": refined["model_tier"],
+        "detected_symptoms": [k for k, v in refined["symptoms"].items() if v == 1]
+    }
+
+@router.get("/stats")
+async def get_transcription_stats():
+    """
+    Current Whisper load (in-flight notes, measured real-time factor, usage per tier)
+    and the language-detection time saved by per-patient language hints.
+    """
+    return {"status": "success", "whisper": WHISPER_POLICY.stats(), "language": get_language_stats()}
@@ -1,27 +1,91 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, UploadFile, File, Form, HTTPException, Query
-from backend.rppg_engine import RPPGHeartRateEngine
-from backend.database.auth import log_vital, get_user_by_token
-import cv2
-import numpy as np
+from backend.app.services.frame_protocol import FrameProtocolError, parse_frame, parse_samples
+from backend.app.services.frame_stream import LatestFrameSlot, RateMeter
+from backend.app.services.rppg_workers import ANALYSIS_TICK_SECONDS, RPPGWorkerPool, WorkerUnavailable
+from backend.rppg_engine import RPPGHeartRateEngine, SpectralBatchScheduler
+from backend.database.async_db import log_vital, get_user_by_token
+from backend.database.vitals_buffer import vitals_buffer
+import asyncio
 import base64
-import shutil
+import binascii
+import math
 import os
+import time
+import uuid
 
 router = APIRouter(prefix="/vitals", tags=["Vitals"])
 
-# Global state for simple session management in MVP
-# In production, use Redis or mapped memory
-active_engines = {} 
+# rPPG sessions live in worker processes (sharded by session key), so MediaPipe
+# and SciPy never block this event loop. Each worker batches its sessions' BPM updates.
+rppg_pool = RPPGWorkerPool()
+
+# Edge-mode sessions only run the signal-processing half of the engine (no FaceMesh),
+# in this process; their BPM updates are batched across sessions on the event loop.
+# They are capped like the worker sessions: connections past the cap are refused.
+MAX_EDGE_SESSIONS = int(os.getenv("LIFELINE_EDGE_MAX_SESSIONS", 200))
+edge_scheduler = SpectralBatchScheduler()
+edge_engines = set()  # Live edge sessions (each ends with its WebSocket)
+edge_counters = {"created": 0, "rejected": 0}
+_edge_ticker = None
+
+async def _tick_edge_scheduler():
+    while True:
+        await asyncio.sleep(ANALYSIS_TICK_SECONDS)
+        edge_scheduler.run_tick()
+
+@router.on_event("startup")
+async def start_rppg_pool():
+    global _edge_ticker
+    rppg_pool.start()
+    _edge_ticker = asyncio.create_task(_tick_edge_scheduler())
+
+@router.on_event("shutdown")
+async def stop_rppg_pool():
+    if _edge_ticker is not None:
+        _edge_ticker.cancel()
+    rppg_pool.shutdown()
+
+async def _receive_frames(websocket: WebSocket, slot: LatestFrameSlot):
+    """
+    Reads the socket as fast as the client sends, keeping only the newest message
+    as (receive time, message). The receive time stands in for the capture time of
+    untimed frames, so the engine resamples across the frames dropped here.
+    """
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            slot.put((time.monotonic(), message))
+    finally:
+        slot.close()
+
+async def _process_ws_frame(session_key, data, shape=None, timestamp=None):
+    # A dead or stuck worker costs this frame, not the connection
+    try:
+        return await rppg_pool.process_frame(session_key, data, shape=shape, timestamp=timestamp)
+    except (asyncio.TimeoutError, WorkerUnavailable) as e:
+        return {"error": f"rPPG worker unavailable: {e or 'timed out'}"}
 
 @router.websocket("/heartrate/ws")
 async def websocket_heartrate(websocket: WebSocket, token: str = Query(...)):
     """
     WebSocket endpoint for real-time heart rate monitoring.
-    Expects: Base64 encoded image strings or raw bytes.
-    Returns: JSON {"bpm": float|None}
+    Expects: binary frames (see services/frame_protocol.py: seq, capture timestamp,
+             format header + JPEG/raw payload), or Base64 image strings as a fallback.
+    Returns: JSON {"bpm": float|None, "confidence": float|None, "quality": {...},
+             "processing_fps": float|None, "dropped": int}, plus "seq" and "timestamp"
+             for binary frames. Readings with confidence < 1.0 are provisional (buffer
+             still filling); while quality is not ok the last BPM is held.
+             A frame that cannot be processed gets {"error": str} (plus "seq" when
+             known) instead, and the connection stays open.
+    Frames arriving faster than they can be processed are dropped (newest wins);
+    clients should capture at about "processing_fps". Frames without a capture
+    timestamp (Base64, or a header timestamp of 0) are timed by their arrival at
+    the server; a client should either always or never send timestamps.
     """
     # 1. Security: Validate Token
-    user = get_user_by_token(token)
+    user = await get_user_by_token(token)
     if not user:
         # Close with policy violation code if invalid
         print(f"❌ WebSocket Auth Failed: Invalid Token '{token}'")
@@ -31,35 +95,61 @@ async def websocket_heartrate(websocket: WebSocket, token: str = Query(...)):
     await websocket.accept()
     print(f"✅ WebSocket Connected: {user['name']} ({token})")
     
-    # Create an engine instance for this connection
-    engine = RPPGHeartRateEngine()
+    # Each connection gets its own engine (kept apart from the POST session)
+    session_key = f"ws:{token}:{uuid.uuid4().hex}"
+    
+    # Latest-frame-wins: the receiver drains the socket, frames the engine can't keep up with are dropped
+    slot = LatestFrameSlot()
+    meter = RateMeter()
+    receiver = asyncio.create_task(_receive_frames(websocket, slot))
     
     try:
         while True:
-            # Receive data (text base64 or bytes)
-            data = await websocket.receive_text()
-            
-            # Handle Base64 header if present
-            if "," in data:
-                data = data.split(",")[1]
-            
-            # Decode image
-            try:
-                image_bytes = base64.b64decode(data)
-                nparr = np.frombuffer(image_bytes, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            except Exception as e:
-                print(f"Frame decode error: {e}")
-                continue
+            item = await slot.get()
+            if item is None:
+                await receiver  # Re-raises the disconnect (or receive error)
+                break
+            received_at, message = item
 
-            if frame is None:
-                continue
+            if message.get("bytes") is not None:
+                # Binary protocol: the payload stays a view into the received buffer
+                try:
+                    header, payload = parse_frame(message["bytes"])
+                except FrameProtocolError as e:
+                    print(f"Frame protocol error: {e}")
+                    await websocket.send_json({"error": str(e)} if e.seq is None else {"seq": e.seq, "error": str(e)})
+                    continue
+                timestamp = header["timestamp"] if header["timestamp"] is not None else received_at
+                result = await _process_ws_frame(session_key, payload, shape=header["shape"], timestamp=timestamp)
+                response = {"seq": header["seq"], "timestamp": header["timestamp"]}
+            else:
+                # Compatibility: Base64 text, with or without a data-URL header
+                data = message.get("text") or ""
+                if "," in data:
+                    data = data.split(",")[1]
+                try:
+                    image_bytes = base64.b64decode(data)
+                except (binascii.Error, ValueError) as e:
+                    print(f"Frame decode error: {e}")
+                    await websocket.send_json({"error": f"Invalid Base64 frame: {e}"})
+                    continue
+                result = await _process_ws_frame(session_key, image_bytes, timestamp=received_at)
+                response = {}
 
-            # Process frame
-            bpm = engine.process_frame(frame)
+            if "error" in result:
+                print(f"Frame decode error: {result['error']}")
+                response["error"] = result["error"]
+                await websocket.send_json(response)
+                continue
+            bpm = result["bpm"]
+            meter.tick()
             
-            # Send result
-            response = {"bpm": bpm}
+            # Send result, with the rate the client should capture at
+            response["bpm"] = bpm
+            response["confidence"] = result["confidence"]
+            response["quality"] = result["quality"]
+            response["processing_fps"] = meter.fps
+            response["dropped"] = slot.dropped
             await websocket.send_json(response)
             
             # Log to DB if BPM is valid
@@ -77,43 +167,148 @@ async def websocket_heartrate(websocket: WebSocket, token: str = Query(...)):
             await websocket.close()
         except:
             pass
+    finally:
+        receiver.cancel()
+        try:
+            await rppg_pool.close_session(session_key)
+        except Exception:
+            pass
+
+@router.websocket("/signal/ws")
+async def websocket_signal(websocket: WebSocket, token: str = Query(...)):
+    """
+    Edge mode: the device tracks the face and computes the forehead ROI means itself.
+    Expects: batches of (timestamp, mean R, G, B) samples, packed binary or JSON
+             (see parse_samples in services/frame_protocol.py). Timestamps are the
+             capture times in seconds; any sampling rate works (the engine resamples).
+             At most MAX_SAMPLES_PER_MESSAGE samples per message.
+    Returns: JSON {"bpm": float|None, "confidence": float|None, "quality": {...},
+             "accepted": int} per batch, or {"error": str} for a malformed one.
+    Closes with 1013 (try again later) when MAX_EDGE_SESSIONS are live.
+    """
+    user = await get_user_by_token(token)
+    if not user:
+        print(f"❌ WebSocket Auth Failed: Invalid Token '{token}'")
+        await websocket.close(code=4001)
+        return
+    if len(edge_engines) >= MAX_EDGE_SESSIONS:
+        edge_counters["rejected"] += 1
+        print(f"⚠️ Edge WebSocket refused: {len(edge_engines)} sessions live")
+        await websocket.accept()  # Closing before accept would reach the client as a bare HTTP 403
+        await websocket.close(code=1013)
+        return
+
+    # Registered before the accept() await, so concurrent connects cannot overshoot the cap
+    engine = RPPGHeartRateEngine(landmarks=False, scheduler=edge_scheduler)
+    edge_engines.add(engine)
+    edge_counters["created"] += 1
+    last_timestamp = float("-inf")
+
+    try:
+        await websocket.accept()
+        print(f"✅ Edge WebSocket Connected: {user['name']} ({token})")
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            try:
+                samples = parse_samples(message["bytes"] if message.get("bytes") is not None else message.get("text") or "")
+            except FrameProtocolError as e:
+                print(f"Edge sample error: {e}")
+                await websocket.send_json({"error": str(e)})
+                continue
+
+            accepted = 0
+            bpm = engine.last_bpm
+            for timestamp, green in samples:
+                # Resent or out-of-order samples would fold the signal back on itself
+                if timestamp <= last_timestamp:
+                    continue
+                last_timestamp = timestamp
+                bpm = engine.process_sample(green, timestamp)
+                accepted += 1
+
+            confidence = engine.last_confidence if bpm is not None else None
+            await websocket.send_json(
+                {"bpm": bpm, "confidence": confidence, "quality": engine.quality_report(), "accepted": accepted}
+            )
+
+    except WebSocketDisconnect:
+        print("Client disconnected from Edge Vitals WS")
+    except Exception as e:
+        print(f"Edge Vitals WS Error: {e}")
+        try:
+            await websocket.close()
+        except:
+            pass
+    finally:
+        edge_engines.discard(engine)
 
 @router.post("/process_frame")
-async def process_frame_post(token: str = Form(...), file: UploadFile = File(...)):
+async def process_frame_post(token: str = Form(...), file: UploadFile = File(...), timestamp: float = Form(None)):
     """
     POST endpoint for frame-by-frame processing (Stateless-ish).
     Uses 'token' to maintain state across requests.
+    Send the capture `timestamp` (seconds) to post at a lower or irregular rate
+    (0 or omitted means untimed).
     """
-    # Get or create engine for this user
-    if token not in active_engines:
-        active_engines[token] = RPPGHeartRateEngine()
-    
-    engine = active_engines[token]
-    
+    if timestamp is not None and not math.isfinite(timestamp):
+        raise HTTPException(status_code=400, detail="timestamp must be a finite number")
+
     # Read file
     try:
         contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
     except Exception as e:
          raise HTTPException(status_code=400, detail=f"Invalid image data: {e}")
 
-    if frame is None:
-        raise HTTPException(status_code=400, detail="Could not decode image")
-
-    # Process
-    bpm = engine.process_frame(frame)
+    # Process on the worker that owns this user's engine (created on first frame)
+    try:
+        result = await rppg_pool.process_frame(token, contents, timestamp=timestamp or None)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="rPPG worker timed out")
+    except WorkerUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    bpm = result["bpm"]
+    confidence = result["confidence"]
+    quality = result["quality"]
     
-    # Log to DB
-    if bpm is not None:
-        log_vital(token, bpm)
+    # Log to DB (full-window readings from a clean signal only; provisional ones are for the UI)
+    if bpm is not None and confidence == 1.0 and quality["ok"]:
+        await log_vital(token, bpm)
     
-    return {"status": "success", "bpm": bpm}
+    return {
+        "status": "success",
+        "bpm": bpm,
+        "confidence": confidence,
+        "provisional": bpm is not None and confidence < 1.0,
+        "quality": quality,
+    }
 
 @router.delete("/session/{token}")
 async def clear_session(token: str):
     """Clear the rPPG engine session for a user"""
-    if token in active_engines:
-        del active_engines[token]
+    try:
+        closed = await rppg_pool.close_session(token)
+    except (asyncio.TimeoutError, WorkerUnavailable):
+        raise HTTPException(status_code=503, detail="rPPG worker unavailable")
+    if closed:
         return {"status": "cleared"}
     return {"status": "not_found"}
+
+@router.get("/stats")
+async def rppg_stats():
+    """
+    Live rPPG sessions, memory, evictions and batched BPM analysis per worker,
+    edge-mode sessions and the vitals write queue.
+    """
+    workers = await rppg_pool.stats()
+    totals = {}
+    for worker in workers:
+        for name, value in worker.items():
+            totals[name] = totals.get(name, 0) + value
+    return {"workers": workers, "totals": totals,
+            "edge_sessions": dict(edge_counters, live=len(edge_engines), max=MAX_EDGE_SESSIONS),
+            "edge_analysis": {"analysed": edge_scheduler.analysed, "pending_analysis": edge_scheduler.pending()},
+            "vitals_writes": vitals_buffer.stats()}
@@ -0,0 +1,116 @@
+"""
+Script: frame_protocol.py
+Role: Binary Frame Protocol for the Heart-Rate WebSocket
+Author: Member 3 (Backend Lead)
+Description: Parses binary WebSocket frames: a fixed little-endian header
+followed by the image payload. The payload is returned as a memoryview into the
+received buffer, so nothing is copied before it reaches the rPPG worker's
+shared-memory slot.
+
+Header (16 bytes, little-endian):
+    uint32  seq        Client frame counter, echoed back in the response
+    float64 timestamp  Capture time in seconds (client clock), echoed back.
+                       0 means "no timestamp" (frames are then assumed to be
+                       evenly spaced); NaN and infinities are rejected.
+    uint8   format     FORMAT_ENCODED (JPEG/PNG bytes) or FORMAT_BGR24 (raw pixels)
+    uint8   reserved
+    uint16  width      Raw formats only (0 for encoded)
+Raw formats carry their height implicitly: len(payload) / (width * channels).
+Payloads are limited to MAX_PAYLOAD_BYTES (a raw 1080p BGR24 frame).
+
+Edge-mode sample messages (ROI means computed on the device) are parsed here too.
+"""
+
+import json
+import math
+import struct
+
+HEADER = struct.Struct("<IdBxH")
+
+FORMAT_ENCODED = 0  # JPEG/PNG, decoded with cv2.imdecode
+FORMAT_BGR24 = 1    # Packed 8-bit BGR rows, no padding
+FORMATS = (FORMAT_ENCODED, FORMAT_BGR24)
+
+CHANNELS = {FORMAT_BGR24: 3}
+
+MAX_PAYLOAD_BYTES = 1920 * 1080 * 3  # Also the size of each rPPG worker's shared-memory slot
+
+
+class FrameProtocolError(ValueError):
+    """Raised for binary messages that do not follow the frame protocol. `seq` is set once the header parsed."""
+
+    def __init__(self, message, seq=None):
+        super().__init__(message)
+        self.seq = seq
+
+
+def parse_frame(message):
+    """
+    Splits a binary message into (header dict, payload memoryview).
+    For raw formats the header also gets the frame "shape" (h, w, channels).
+    """
+    if len(message) <= HEADER.size:
+        raise FrameProtocolError("Message shorter than the frame header")
+
+    seq, timestamp, fmt, width = HEADER.unpack_from(message)
+    if fmt not in FORMATS:
+        raise FrameProtocolError(f"Unknown frame format {fmt}", seq)
+    if not math.isfinite(timestamp):
+        raise FrameProtocolError("Frame timestamp is not a finite number", seq)
+
+    payload = memoryview(message)[HEADER.size:]
+    if len(payload) > MAX_PAYLOAD_BYTES:
+        raise FrameProtocolError(f"Frame larger than {MAX_PAYLOAD_BYTES} bytes", seq)
+    # Clients that leave the header at 0 send untimed frames
+    header = {"seq": seq, "timestamp": timestamp or None, "format": fmt, "shape": None}
+
+    if fmt in CHANNELS:
+        row_bytes = width * CHANNELS[fmt]
+        if width == 0 or len(payload) % row_bytes:
+            raise FrameProtocolError("Raw payload size does not match the frame width", seq)
+        header["shape"] = (len(payload) // row_bytes, width, CHANNELS[fmt])
+
+    return header, payload
+
+
+# Edge mode (/vitals/signal/ws): clients send ROI means instead of frames.
+# Binary messages are packed little-endian float64 rows of (timestamp, R, G, B);
+# text messages are JSON {"samples": [[timestamp, green] or [timestamp, R, G, B], ...]}.
+# Every sample must carry a finite timestamp and value (0 is a valid time here).
+# Batches are parsed and fed on the event loop, so they are capped at
+# MAX_SAMPLES_PER_MESSAGE (10 s at 30 Hz; clients send every second or so).
+SAMPLE_ROW = struct.Struct("<4d")
+MAX_SAMPLES_PER_MESSAGE = 300
+MAX_JSON_ROW_CHARS = 128  # Generous for [t, R, G, B] as JSON; bounds the text before parsing
+
+
+def _check_finite(samples):
+    for t, g in samples:
+        if not (math.isfinite(t) and math.isfinite(g)):
+            raise FrameProtocolError("Sample timestamps and values must be finite numbers")
+    return samples
+
+
+def parse_samples(message):
+    """Returns [(timestamp, green), ...] from an edge-mode message (bytes or JSON text)."""
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        if len(message) > MAX_SAMPLES_PER_MESSAGE * SAMPLE_ROW.size:
+            raise FrameProtocolError(f"More than {MAX_SAMPLES_PER_MESSAGE} samples in one message")
+        if len(message) % SAMPLE_ROW.size:
+            raise FrameProtocolError("Sample payload is not a whole number of (t, R, G, B) rows")
+        return _check_finite([(t, g) for t, _, g, _ in SAMPLE_ROW.iter_unpack(message)])
+
+    if len(message) > MAX_SAMPLES_PER_MESSAGE * MAX_JSON_ROW_CHARS:
+        raise FrameProtocolError(f"Samples message longer than {MAX_SAMPLES_PER_MESSAGE * MAX_JSON_ROW_CHARS} characters")
+    try:
+        rows = json.loads(message)["samples"]
+        if len(rows) > MAX_SAMPLES_PER_MESSAGE:
+            raise ValueError(f"more than {MAX_SAMPLES_PER_MESSAGE} samples in one message")
+        samples = []
+        for row in rows:
+            if len(row) not in (2, 4):
+                raise ValueError(f"sample rows must be [t, green] or [t, R, G, B], got {len(row)} values")
+            samples.append((float(row[0]), float(row[2] if len(row) == 4 else row[1])))
+    except (ValueError, KeyError, TypeError, IndexError) as e:
+        raise FrameProtocolError(f"Invalid samples message: {e}")
+    return _check_finite(samples)
@@ -0,0 +1,70 @@
+"""
+Script: frame_stream.py
+Role: Latest-Frame-Wins Buffering for Streaming rPPG
+Author: Member 3 (Backend Lead)
+Description: Decouples reading a WebSocket from processing its frames. The
+receive side overwrites a single slot, so frames the engine cannot keep up with
+are dropped instead of queueing in the socket, and the processing side always
+picks up the newest frame. A rate meter reports the fps actually processed, so
+clients can throttle capture to match.
+"""
+
+import asyncio
+import time
+
+FPS_EWMA_ALPHA = 0.1
+
+
+class LatestFrameSlot:
+    """Single-item mailbox: put() replaces any unprocessed item and counts it as dropped."""
+
+    def __init__(self):
+        self._item = None
+        self._event = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, item):
+        if self._item is not None:
+            self.dropped += 1
+        self._item = item
+        self.received += 1
+        self._event.set()
+
+    def close(self):
+        """Wakes the consumer; get() returns None once the slot is empty."""
+        self._closed = True
+        self._event.set()
+
+    async def get(self):
+        """Waits for the newest item, or returns None after close()."""
+        while self._item is None:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        item, self._item = self._item, None
+        return item
+
+
+class RateMeter:
+    """EWMA of events per second, from the intervals between tick() calls."""
+
+    def __init__(self, alpha=FPS_EWMA_ALPHA):
+        self.alpha = alpha
+        self._last = None
+        self._interval = None
+
+    def tick(self):
+        now = time.monotonic()
+        if self._last is not None:
+            dt = now - self._last
+            self._interval = dt if self._interval is None else (1 - self.alpha) * self._interval + self.alpha * dt
+        self._last = now
+
+    @property
+    def fps(self):
+        if not self._interval:
+            return None
+        return round(1.0 / self._interval, 1)
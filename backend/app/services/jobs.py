@@ -0,0 +1,109 @@
+"""
+Script: jobs.py
+Role: Bounded In-Memory Job Store for Long-Running Triage
+Author: Member 4 (Coordinator)
+Description: Tracks submitted voice-triage jobs (queued -> running -> done/failed)
+with a TTL and a hard cap on stored jobs, and wakes WebSocket subscribers when a
+job finishes. Only finished jobs are evicted to make room: a queued or running
+job is still owed to its client, so a store full of them refuses new jobs.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+FINAL_STATES = ("done", "failed")
+
+
+class JobStoreFull(RuntimeError):
+    """Raised by create() when every stored job is still queued or running."""
+
+
+class JobStore:
+    """
+    Thread-safe job registry. Worker threads update jobs; async handlers read
+    them or await completion with wait().
+    """
+
+    def __init__(self, max_jobs=500, ttl_seconds=900):
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self._jobs = OrderedDict()  # job_id -> job dict, oldest first
+        self._waiters = {}  # job_id -> [(loop, asyncio.Event)]
+        self._lock = threading.Lock()
+
+    def create(self):
+        """Registers a new queued job and returns its id. Raises JobStoreFull at the cap."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._evict(now, make_room=True)
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "state": "queued",
+                "created_at": now,
+                "updated_at": now,
+                "result": None,
+                "error": None,
+            }
+        return job_id
+
+    def update(self, job_id, state, result=None, error=None):
+        """Moves a job to a new state; final states wake any subscribers."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return  # Evicted while running
+            job.update(state=state, result=result, error=error, updated_at=time.time())
+            waiters = self._waiters.pop(job_id, []) if state in FINAL_STATES else []
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def get(self, job_id):
+        """Returns a copy of the job, or None if unknown or expired."""
+        with self._lock:
+            self._evict(time.time())
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def active_count(self):
+        """Number of queued or running jobs."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["state"] not in FINAL_STATES)
+
+    async def wait(self, job_id, timeout=None):
+        """Waits until the job reaches a final state. Returns the job, or None if unknown."""
+        event = asyncio.Event()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["state"] not in FINAL_STATES:
+                self._waiters.setdefault(job_id, []).append((asyncio.get_running_loop(), event))
+            else:
+                event.set()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.get(job_id)
+
+    def _evict(self, now, make_room=False):
+        """Drops expired jobs; with make_room, also the oldest finished ones at the cap."""
+        expired = [jid for jid, job in self._jobs.items() if now - job["updated_at"] > self.ttl_seconds]
+        for jid in expired:
+            self._drop(jid)
+
+        while make_room and len(self._jobs) >= self.max_jobs:
+            victim = next((jid for jid, job in self._jobs.items() if job["state"] in FINAL_STATES), None)
+            if victim is None:
+                raise JobStoreFull(f"{len(self._jobs)} triage jobs already queued or running")
+            self._drop(victim)
+
+    def _drop(self, job_id):
+        del self._jobs[job_id]
+        # Wake subscribers so they see the job is gone instead of hanging
+        for loop, event in self._waiters.pop(job_id, []):
+            loop.call_soon_threadsafe(event.set)
@@ -0,0 +1,132 @@
+"""
+Script: rppg_sessions.py
+Role: Bounded rPPG Session Store
+Author: Member 3 (Backend Lead)
+Description: Keeps the RPPGHeartRateEngine of each session with an idle TTL and
+least-recently-used eviction once a session count or memory budget is exceeded,
+so clients that never call DELETE /vitals/session/{token} cannot pin FaceMesh
+instances forever. Evicted engines are closed; counters feed the vitals stats.
+
+Sessions that sent a frame within the last ACTIVE_SECONDS are never evicted to
+make room: evicting a live stream would only recreate it on its next frame and
+evict another one. A new session that does not fit is refused instead.
+"""
+
+import time
+from collections import OrderedDict
+
+ACTIVE_SECONDS = 5.0
+
+
+class SessionLimitReached(RuntimeError):
+    """Raised when a new session does not fit and every session is still streaming."""
+
+
+class RPPGSessionStore:
+    """
+    LRU map of session key -> engine. Not thread-safe: each rPPG worker owns
+    one store and uses it from its single loop.
+    """
+
+    def __init__(self, factory, max_sessions=200, ttl_seconds=120, memory_budget_bytes=None,
+                 active_seconds=ACTIVE_SECONDS):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        self.active_seconds = active_seconds
+        self._sessions = OrderedDict()  # key -> (engine, last_used), least recently used first
+        self.created = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+        self.rejected = 0
+        self.closed = 0
+
+    def get(self, key):
+        """
+        Returns the session's engine, creating it (and making room) if needed.
+        Raises SessionLimitReached if a new session would need an active one evicted.
+        """
+        now = time.monotonic()
+        entry = self._sessions.pop(key, None)
+        if entry is None:
+            self.expire(now)
+            self._make_room(now)
+            engine = self.factory()
+            self.created += 1
+        else:
+            engine = entry[0]
+        self._sessions[key] = (engine, now)
+        return engine
+
+    def close(self, key):
+        """Drops a session on request. Returns True if it existed."""
+        entry = self._sessions.pop(key, None)
+        if entry is None:
+            return False
+        entry[0].close()
+        self.closed += 1
+        return True
+
+    def close_all(self):
+        """Closes every session (worker shutdown)."""
+        while self._sessions:
+            self._evict(next(iter(self._sessions)))
+
+    def expire(self, now=None):
+        """Closes sessions idle for longer than the TTL. Returns how many were dropped."""
+        now = time.monotonic() if now is None else now
+        dropped = 0
+        # Oldest use first, so stop at the first session that is still fresh
+        while self._sessions:
+            key, (engine, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl_seconds:
+                break
+            self._evict(key)
+            self.evicted_idle += 1
+            dropped += 1
+        return dropped
+
+    def memory_bytes(self):
+        return sum(engine.memory_bytes() for engine, _ in self._sessions.values())
+
+    def stats(self):
+        return {
+            "live": len(self._sessions),
+            "memory_bytes": self.memory_bytes(),
+            "created": self.created,
+            "closed": self.closed,
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+            "rejected": self.rejected,
+        }
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _make_room(self, now):
+        """Evicts least recently used (not active) sessions until one more fits both limits."""
+        while self._sessions and len(self._sessions) >= self.max_sessions:
+            self._evict_lru(now)
+        if self.memory_budget_bytes is None:
+            return
+        used = self.memory_bytes()
+        per_session = max((engine.memory_bytes() for engine, _ in self._sessions.values()), default=0)
+        while self._sessions and used + per_session > self.memory_budget_bytes:
+            used -= self._evict_lru(now)
+
+    def _evict_lru(self, now):
+        """Evicts the least recently used session and returns its memory, unless it is active."""
+        key, (engine, last_used) = next(iter(self._sessions.items()))
+        if now - last_used < self.active_seconds:
+            # Least recently used is still streaming, so every session is: refuse the new one
+            self.rejected += 1
+            raise SessionLimitReached(f"rPPG worker full ({len(self._sessions)} active sessions)")
+        freed = engine.memory_bytes()
+        self._evict(key)
+        self.evicted_lru += 1
+        return freed
+
+    def _evict(self, key):
+        engine, _ = self._sessions.pop(key)
+        engine.close()
@@ -0,0 +1,393 @@
+"""
+Script: rppg_workers.py
+Role: rPPG Worker Process Pool
+Author: Member 3 (Backend Lead)
+Description: Hosts RPPGHeartRateEngine sessions in separate processes so MediaPipe
+and SciPy never run on the API event loop. Sessions are sharded by a hash of
+their key, so a session's engine always lives in the same worker. Encoded frames
+are handed over through per-worker shared-memory slots; only small control
+messages go through the queues. Results come back asynchronously to the caller,
+over one pipe per worker (a killed worker cannot wedge a lock shared with the
+others). The results thread also waits on the workers' process sentinels: when a
+worker dies its pending requests fail with WorkerUnavailable and it is respawned
+with fresh slots (its sessions restart from an empty buffer). A worker that
+keeps dying right after it starts (e.g. a broken install) is respawned with
+exponential backoff, and left down after MAX_FAST_FAILURES in a row.
+
+Run the API with a single uvicorn worker: CPU parallelism for rPPG comes from
+this pool, and session state stays in one place.
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import threading
+import time
+import zlib
+from multiprocessing import shared_memory
+
+from backend.app.services.frame_protocol import MAX_PAYLOAD_BYTES
+
+WORKER_COUNT = int(os.getenv("LIFELINE_RPPG_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+SLOTS_PER_WORKER = 8                # Frames in flight per worker
+SLOT_BYTES = MAX_PAYLOAD_BYTES      # Largest frame accepted (raw 1080p BGR24; encoded frames are smaller)
+REQUEST_TIMEOUT_SECONDS = 10.0
+ANALYSIS_TICK_SECONDS = 0.05        # Batched BPM analysis cadence inside each worker
+
+# Respawning: a worker that dies within FAST_FAILURE_SECONDS of starting waits
+# RESTART_BACKOFF_SECONDS (doubling, capped) before the next try, and is left down
+# after MAX_FAST_FAILURES such deaths in a row
+FAST_FAILURE_SECONDS = 10.0
+RESTART_BACKOFF_SECONDS = 1.0
+RESTART_BACKOFF_MAX_SECONDS = 30.0
+MAX_FAST_FAILURES = 5
+
+# Session limits for the whole pool (split evenly across workers)
+MAX_SESSIONS = int(os.getenv("LIFELINE_RPPG_MAX_SESSIONS", 200))
+SESSION_TTL_SECONDS = float(os.getenv("LIFELINE_RPPG_SESSION_TTL", 120))
+MEMORY_BUDGET_MB = int(os.getenv("LIFELINE_RPPG_MEMORY_MB", 2048))
+
+
+class WorkerUnavailable(RuntimeError):
+    """
+    Raised when a request's worker died (it is being respawned, or is down
+    after repeated start-up failures), is full of active sessions, or the pool
+    is stopped.
+    """
+
+
+def shard_for(key, workers):
+    """Stable worker index for a session key (same key -> same worker)."""
+    return zlib.crc32(key.encode("utf-8")) % workers
+
+
+def _worker_main(slot_names, requests, results, limits):
+    """Worker process loop: owns the engines of its shard."""
+    import cv2
+    import numpy as np
+    from backend.app.services.rppg_sessions import RPPGSessionStore, SessionLimitReached
+    from backend.rppg_engine import RPPGHeartRateEngine, SpectralBatchScheduler
+
+    # Spawned workers share the parent's resource tracker, and the parent unlinks the slots
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    scheduler = SpectralBatchScheduler()
+    engines = RPPGSessionStore(lambda: RPPGHeartRateEngine(scheduler=scheduler), **limits)
+    last_tick = time.monotonic()
+
+    while True:
+        try:
+            msg = requests.get(timeout=ANALYSIS_TICK_SECONDS)
+        except queue.Empty:
+            msg = ()
+
+        if msg is None:
+            break
+
+        if msg:
+            kind, req_id, key = msg[:3]
+            slot = None
+            try:
+                if kind == "frame":
+                    slot, length, shape, timestamp = msg[3], msg[4], msg[5], msg[6]
+                    # Read straight from the shared buffer (no copy into this process)
+                    view = slots[slot].buf[:length]
+                    try:
+                        pixels = np.frombuffer(view, np.uint8)
+                        if shape is None:
+                            frame = cv2.imdecode(pixels, cv2.IMREAD_COLOR)
+                        else:
+                            # Raw BGR: the engine reads the slot in place (it only keeps its own copies)
+                            frame = pixels.reshape(shape)
+                        if frame is None:
+                            payload = {"error": "Could not decode image"}
+                        else:
+                            engine = engines.get(key)
+                            bpm = engine.process_frame(frame, timestamp)
+                            payload = {
+                                "bpm": bpm,
+                                "confidence": engine.last_confidence if bpm is not None else None,
+                                "quality": engine.quality_report(),
+                            }
+                    finally:
+                        # Drop every view of the slot before the parent reuses it
+                        pixels = frame = None
+                        view.release()
+                elif kind == "close":
+                    payload = {"closed": engines.close(key)}
+                elif kind == "stats":
+                    payload = dict(engines.stats(), analysed=scheduler.analysed, pending_analysis=scheduler.pending())
+                else:
+                    payload = {"error": f"Unknown request '{kind}'"}
+            except SessionLimitReached as e:
+                payload = {"error": str(e), "full": True}
+            except Exception as e:
+                payload = {"error": str(e)}
+            results.send((req_id, payload, slot))
+
+        # Batch the due BPM updates of every session in this worker
+        now = time.monotonic()
+        if now - last_tick >= ANALYSIS_TICK_SECONDS:
+            scheduler.run_tick()
+            engines.expire(now)
+            last_tick = now
+
+    engines.close_all()
+    for shm in slots:
+        shm.close()
+
+
+class RPPGWorkerPool:
+    """Parent-side handle: shards sessions, moves frames through shared memory, awaits results."""
+
+    def __init__(self, workers=WORKER_COUNT, slots_per_worker=SLOTS_PER_WORKER, slot_bytes=SLOT_BYTES):
+        self.workers = workers
+        self.slots_per_worker = slots_per_worker
+        self.slot_bytes = slot_bytes
+        self._ctx = multiprocessing.get_context("spawn")  # Never fork the event loop's threads
+        self._processes = []
+        self._requests = []
+        self._slots = []        # Per worker: list of SharedMemory
+        self._free_slots = []   # Per worker: asyncio.Queue of free slot indices
+        self._results = []      # Per worker: receiving end of its result pipe
+        self._generations = []  # Per worker: bumped on respawn, so stale results are ignored
+        self._restarts = []
+        self._spawned_at = []     # Per worker: monotonic time of the last spawn
+        self._fast_failures = []  # Per worker: deaths in a row soon after spawning
+        self._available = []      # Per worker: False while waiting to respawn, or down
+        self._respawn_timers = {}  # worker -> asyncio.TimerHandle of a delayed respawn
+        self._pending = {}      # req_id -> (loop, future, worker index, generation)
+        self._ids = itertools.count()
+        self._limits = None
+        self._loop = None
+        self._reader = None
+        self._started = False
+
+    def start(self):
+        """Starts the workers. Call from the event loop that will use the pool."""
+        if self._started:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._limits = {
+            "max_sessions": max(1, MAX_SESSIONS // self.workers),
+            "ttl_seconds": SESSION_TTL_SECONDS,
+            "memory_budget_bytes": MEMORY_BUDGET_MB * 1024 * 1024 // self.workers,
+        }
+        self._free_slots = [asyncio.Queue() for _ in range(self.workers)]
+        self._slots = [[] for _ in range(self.workers)]
+        self._requests = [None] * self.workers
+        self._results = [None] * self.workers
+        self._processes = [None] * self.workers
+        self._generations = [0] * self.workers
+        self._restarts = [0] * self.workers
+        self._spawned_at = [0.0] * self.workers
+        self._fast_failures = [0] * self.workers
+        self._available = [False] * self.workers
+        self._respawn_timers = {}
+        for worker in range(self.workers):
+            self._spawn(worker)
+
+        self._started = True
+        self._reader = threading.Thread(target=self._read_results, name="rppg-results", daemon=True)
+        self._reader.start()
+        print(f"✅ rPPG worker pool started: {self.workers} processes")
+
+    def _spawn(self, worker):
+        """(Re)creates a worker's slots, request queue and process; every slot starts free."""
+        slots = [shared_memory.SharedMemory(create=True, size=self.slot_bytes)
+                 for _ in range(self.slots_per_worker)]
+        requests = self._ctx.Queue()
+        results, worker_end = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main, args=([s.name for s in slots], requests, worker_end, self._limits), daemon=True
+        )
+        process.start()
+        worker_end.close()  # Only the worker writes; EOF on our end once it exits
+        free = self._free_slots[worker]
+        while not free.empty():
+            free.get_nowait()
+        for i in range(self.slots_per_worker):
+            free.put_nowait(i)
+        self._slots[worker] = slots
+        self._requests[worker] = requests
+        self._results[worker] = results
+        self._processes[worker] = process
+        self._spawned_at[worker] = time.monotonic()
+        self._available[worker] = True
+
+    def _respawn(self, process):
+        if not self._started or process not in self._processes:
+            return
+        worker = self._processes.index(process)
+        process.join(timeout=1)
+        self._available[worker] = False
+        # Fail everything the dead worker still owed; their slots go with its memory
+        error = WorkerUnavailable(f"rPPG worker {worker} restarted")
+        for req_id, (loop, future, w, generation) in list(self._pending.items()):
+            if w == worker and generation == self._generations[worker] and self._pending.pop(req_id, None):
+                if not future.done():
+                    future.set_exception(error)
+        free = self._free_slots[worker]
+        while not free.empty():
+            free.get_nowait()  # Nobody may write into the old slots from here on
+        for shm in self._slots[worker]:
+            shm.close()
+            shm.unlink()
+        self._slots[worker] = []
+        self._requests[worker].cancel_join_thread()  # Nobody will read what is still queued
+        self._requests[worker].close()
+        self._requests[worker] = None
+        self._generations[worker] += 1
+
+        if time.monotonic() - self._spawned_at[worker] < FAST_FAILURE_SECONDS:
+            self._fast_failures[worker] += 1
+        else:
+            self._fast_failures[worker] = 0
+        failures = self._fast_failures[worker]
+        if failures >= MAX_FAST_FAILURES:
+            print(f"❌ rPPG worker {worker} exited (code {process.exitcode}) "
+                  f"{failures} times right after starting; leaving it down")
+            return
+        delay = 0.0 if failures == 0 else min(RESTART_BACKOFF_SECONDS * 2 ** (failures - 1),
+                                                RESTART_BACKOFF_MAX_SECONDS)
+        print(f"⚠️ rPPG worker {worker} exited (code {process.exitcode}); respawning in {delay:.1f}s")
+        self._respawn_timers[worker] = self._loop.call_later(delay, self._restart, worker)
+
+    def _restart(self, worker):
+        self._respawn_timers.pop(worker, None)
+        if not self._started:
+            return
+        self._restarts[worker] += 1
+        self._spawn(worker)
+
+    def shutdown(self):
+        if not self._started:
+            return
+        self._started = False  # Exiting workers are not respawned from here on
+        for timer in self._respawn_timers.values():
+            timer.cancel()
+        self._respawn_timers = {}
+        for requests in self._requests:
+            if requests is not None:
+                requests.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._reader.join()
+        for results in self._results:
+            if not results.closed:
+                results.close()
+        for slots in self._slots:
+            for shm in slots:
+                shm.close()
+                shm.unlink()
+        error = WorkerUnavailable("rPPG worker pool stopped")
+        for req_id in list(self._pending):
+            entry = self._pending.pop(req_id, None)
+            if entry is not None and not entry[1].done():
+                entry[1].set_exception(error)
+
+    def _read_results(self):
+        """Reads every worker's result pipe, and hands dead workers to the event loop."""
+        reported = set()
+        while self._started:
+            pipes = [c for c in self._results if not c.closed]
+            processes = [p for p in self._processes if p not in reported]
+            ready = multiprocessing.connection.wait(
+                pipes + [p.sentinel for p in processes], timeout=0.5
+            )
+            for conn in pipes:
+                if conn not in ready:
+                    continue
+                try:
+                    req_id, payload, slot = conn.recv()
+                except (EOFError, OSError):
+                    conn.close()  # Dead worker, everything it sent was read; its sentinel reports it
+                    continue
+                entry = self._pending.pop(req_id, None)
+                if entry is None:
+                    continue
+                loop, future, worker, generation = entry
+                loop.call_soon_threadsafe(self._resolve, future, payload, worker, generation, slot)
+            for process in processes:
+                if process.sentinel in ready and self._started:
+                    reported.add(process)
+                    self._loop.call_soon_threadsafe(self._respawn, process)
+
+    def _resolve(self, future, payload, worker, generation, slot):
+        # The worker is done reading the slot only now, even if the caller gave up.
+        # Slots of a respawned worker's previous process are gone (all new slots start free).
+        if slot is not None and generation == self._generations[worker]:
+            self._free_slots[worker].put_nowait(slot)
+        if not future.done():
+            future.set_result(payload)
+
+    async def _call(self, worker, message, timeout=REQUEST_TIMEOUT_SECONDS):
+        if not self._started:
+            raise WorkerUnavailable("rPPG worker pool stopped")
+        if not self._available[worker]:
+            raise WorkerUnavailable(f"rPPG worker {worker} is restarting or down")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        req_id = next(self._ids)
+        self._pending[req_id] = (loop, future, worker, self._generations[worker])
+        self._requests[worker].put((message[0], req_id) + message[1:])
+        # On timeout the entry stays pending so a late result still frees its slot
+        return await asyncio.wait_for(future, max(timeout, 0))
+
+    async def process_frame(self, key, data, shape=None, timestamp=None):
+        """
+        Runs one frame through the session's engine. `data` is encoded JPEG/PNG
+        bytes, or raw BGR pixels when `shape` (h, w, 3) is given; any buffer
+        (bytes, memoryview) works and is copied once, into the worker's slot.
+        `timestamp` (capture time, seconds) lets the engine resample jittery input.
+        Returns {"bpm": float|None, "confidence": float|None,
+        "quality": {"index": float|None, "ok": bool}} or {"error": str}.
+        Raises asyncio.TimeoutError (no free slot or no reply within
+        REQUEST_TIMEOUT_SECONDS) or WorkerUnavailable (the worker died, or a new
+        session does not fit next to its active ones).
+        """
+        if len(data) > self.slot_bytes:
+            return {"error": f"Frame larger than {self.slot_bytes} bytes"}
+        self.start()
+        worker = shard_for(key, self.workers)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + REQUEST_TIMEOUT_SECONDS
+        if not self._available[worker]:
+            raise WorkerUnavailable(f"rPPG worker {worker} is restarting or down")
+        generation = self._generations[worker]
+        slot = await asyncio.wait_for(self._free_slots[worker].get(), REQUEST_TIMEOUT_SECONDS)
+        if generation != self._generations[worker]:
+            # The worker was respawned while we waited; the index may belong to the new slots
+            raise WorkerUnavailable(f"rPPG worker {worker} restarted")
+        self._slots[worker][slot].buf[:len(data)] = data
+        result = await self._call(worker, ("frame", key, slot, len(data), shape, timestamp), deadline - loop.time())
+        if result.get("full"):
+            raise WorkerUnavailable(result["error"])
+        return result
+
+    async def close_session(self, key):
+        """Drops a session's engine. Returns True if it existed."""
+        if not self._started:
+            return False
+        result = await self._call(shard_for(key, self.workers), ("close", key))
+        return result.get("closed", False)
+
+    async def stats(self):
+        """Per-worker session metrics (live, memory, evictions, analysed/pending BPM updates, restarts, down)."""
+        if not self._started:
+            return []
+        results = await asyncio.gather(*(self._call(w, ("stats", "")) for w in range(self.workers)),
+                                       return_exceptions=True)
+        stats = []
+        for worker, result in enumerate(results):
+            if isinstance(result, (asyncio.TimeoutError, WorkerUnavailable)):
+                result = {"unavailable": 1}
+            elif isinstance(result, BaseException):
+                raise result
+            down = not self._available[worker] and worker not in self._respawn_timers
+            stats.append(dict(result, restarts=self._restarts[worker], down=down))
+        return stats
@@ -7,9 +7,9 @@ Usage: python -m backend.create_doctor
   (run from project root with venv active)
 """
 
-import sqlite3
 import uuid
-from backend.database.models import DB_PATH, init_db
+from backend.database.connection import get_connection
+from backend.database.models import init_db
 
 
 def create_doctor():
@@ -17,14 +17,13 @@ def create_doctor():
     # Ensure DB and tables exist
     init_db()
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     # Check if doctor already exists
     cursor.execute("SELECT id FROM users WHERE name = ?", ("Dr. Strange",))
     if cursor.fetchone():
         print("⚠️  Doctor account already exists. Skipping.")
-        conn.close()
         return
 
     qr_token = str(uuid.uuid4())[:8].upper()
@@ -46,7 +45,6 @@ def create_doctor():
     )
 
     conn.commit()
-    conn.close()
     print(f"✅ Doctor account created!")
     print(f"   Name:  Dr. Strange")
     print(f"   Token: {qr_token}")
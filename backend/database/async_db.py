@@ -0,0 +1,61 @@
+"""
+Script: async_db.py
+Role: Async Database Access for the FastAPI Routers
+Author: Member 3 (Backend Lead)
+Description: sqlite3 is blocking, so calling it from an `async def` handler stalls
+the event loop, and with it every heart-rate WebSocket, for the duration of the
+query. Handlers await these wrappers instead. The queries run on a small pool of
+dedicated DB threads, each with its own pooled WAL connection, so readers run
+concurrently and writes wait on SQLite's busy timeout, not on the loop.
+The thread pool is created on first use and again after shutdown(), so the app
+can be started more than once in a process (tests, reloads).
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import auth
+
+DB_THREADS = int(os.getenv("LIFELINE_DB_THREADS", 4))
+
+_DB_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor():
+    global _DB_EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _DB_EXECUTOR is None:
+            _DB_EXECUTOR = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="lifeline-db")
+        return _DB_EXECUTOR
+
+
+async def run_db(fn, *args, **kwargs):
+    """Runs a blocking DB function on a DB thread and returns its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def get_user_by_token(token):
+    return await run_db(auth.get_user_by_token, token)
+
+
+async def register_user(name, age, blood_type, allergies, conditions, contact):
+    return await run_db(auth.register_user, name, age, blood_type, allergies, conditions, contact)
+
+
+async def log_vital(token, bpm):
+    # Queuing is cheap, but a full queue makes the caller wait for the writer
+    await run_db(auth.log_vital, token, bpm)
+
+
+def shutdown():
+    """Waits for running queries and stops the DB threads (app shutdown). The next query starts new ones."""
+    global _DB_EXECUTOR
+    with _EXECUTOR_LOCK:
+        executor, _DB_EXECUTOR = _DB_EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=True)
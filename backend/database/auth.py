@@ -3,67 +3,64 @@ Script: auth.py
 Role: User Registration & Passport Retrieval
 Author: Member 3 (Backend Lead)
 """
-import sqlite3
 import uuid
-from .models import DB_PATH
+from .connection import get_connection
+from .vitals_buffer import vitals_buffer
 
 def register_user(name, age, blood_type, allergies, conditions, contact):
     """Adds a new patient to the system and generates a unique QR Token."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    conn = get_connection()
     
     # Generate a unique 8-character token for the Emergency QR Card
     qr_token = str(uuid.uuid4())[:8].upper()
     
     try:
-        cursor.execute('''
-            INSERT INTO users (name, age, blood_type, allergies, chronic_conditions, emergency_contact, qr_token)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (name, age, blood_type, allergies, conditions, contact, qr_token))
+        with conn:
+            conn.execute('''
+                INSERT INTO users (name, age, blood_type, allergies, chronic_conditions, emergency_contact, qr_token)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (name, age, blood_type, allergies, conditions, contact, qr_token))
         
-        conn.commit()
         print(f"✅ User '{name}' successfully registered!")
         return qr_token
     except Exception as e:
         print(f"❌ Registration Error: {e}")
         return None
-    finally:
-        conn.close()
 
 def get_user_by_token(token):
     """Retrieves user data using the QR Token (Emergency Mode)."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row # Returns results as a dictionary-like object
-    cursor = conn.cursor()
+    conn = get_connection()
     
-    cursor.execute("SELECT * FROM users WHERE qr_token = ?", (token,))
-    user = cursor.fetchone()
+    user = conn.execute("SELECT * FROM users WHERE qr_token = ?", (token,)).fetchone()
     
     if user:
         user_dict = dict(user)
         # Fetch latest vital
-        cursor.execute("SELECT bpm, timestamp FROM vitals WHERE user_token = ? ORDER BY id DESC LIMIT 1", (token,))
-        vital = cursor.fetchone()
+        vital = conn.execute(
+            "SELECT bpm, timestamp FROM vitals WHERE user_token = ? ORDER BY id DESC LIMIT 1", (token,)
+        ).fetchone()
         if vital:
             user_dict["heart_rate"] = vital["bpm"]
             user_dict["last_vital_time"] = vital["timestamp"]
-        conn.close()
         return user_dict
         
-    conn.close()
     return None
 
 def log_vital(token, bpm):
-    """Logs a heart rate reading to the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    """
+    Logs a heart rate reading. Queued and committed in batches (see
+    vitals_buffer.py), so it may reach the table a flush interval later.
+    """
+    vitals_buffer.add(token, bpm)
+
+def set_user_language(token, language):
+    """Remembers the language detected in a patient's voice note (Whisper code, e.g. 'hi')."""
+    conn = get_connection()
     try:
-        cursor.execute("INSERT INTO vitals (user_token, bpm) VALUES (?, ?)", (token, bpm))
-        conn.commit()
+        with conn:
+            conn.execute("UPDATE users SET preferred_language = ? WHERE qr_token = ?", (language, token))
     except Exception as e:
-        print(f"❌ Vitals Log Error: {e}")
-    finally:
-        conn.close()
+        print(f"❌ Language Update Error: {e}")
 
 if __name__ == "__main__":
     # Test Registration for the Hackathon Demo
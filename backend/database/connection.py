@@ -0,0 +1,73 @@
+"""
+Script: connection.py
+Role: Pooled SQLite Connections
+Author: Member 3 (Backend Lead)
+Description: One long-lived connection per thread instead of a connect/close per
+call. Connections open in WAL mode, so dashboard reads no longer block behind
+vitals writes (and vice versa), with tuned synchronous/cache pragmas. Python's
+sqlite3 keeps a per-connection cache of prepared statements, which only pays
+off now that connections are reused.
+"""
+
+import os
+import sqlite3
+import threading
+
+from .models import DB_PATH
+
+STATEMENT_CACHE_SIZE = 256    # Prepared statements kept per connection
+CACHE_SIZE_KIB = 16 * 1024    # Page cache per connection
+BUSY_TIMEOUT_MS = 5000        # Wait this long for a lock instead of failing with "database is locked"
+
+# NORMAL is safe in WAL mode (no corruption); a power loss can drop the last commits.
+# Set LIFELINE_DB_SYNCHRONOUS=FULL to fsync every commit.
+SYNCHRONOUS = os.getenv("LIFELINE_DB_SYNCHRONOUS", "NORMAL").upper()
+if SYNCHRONOUS not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+    raise ValueError(f"Invalid LIFELINE_DB_SYNCHRONOUS '{SYNCHRONOUS}'")
+
+_local = threading.local()
+_all_connections = set()
+_registry_lock = threading.Lock()
+_generation = 0  # Bumped by close_all(), so threads reopen instead of using a closed connection
+
+
+def _open(path):
+    # check_same_thread=False only so close_all() can close it; each thread uses its own
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def get_connection():
+    """
+    This thread's connection to DB_PATH, opened on first use. Rows come back as
+    sqlite3.Row. Do not close it; use `with conn:` to commit (or roll back) a
+    transaction.
+    """
+    conn = getattr(_local, "conn", None)
+    # A forked child must not reuse its parent's connection
+    if conn is None or _local.pid != os.getpid() or _local.generation != _generation:
+        conn = _open(DB_PATH)
+        _local.conn = conn
+        _local.pid = os.getpid()
+        _local.generation = _generation
+        with _registry_lock:
+            _all_connections.add(conn)
+    return conn
+
+
+def close_all():
+    """Closes every pooled connection (app shutdown). Threads reopen on next use."""
+    global _generation
+    with _registry_lock:
+        _generation += 1
+        connections = list(_all_connections)
+        _all_connections.clear()
+    for conn in connections:
+        conn.close()
@@ -3,7 +3,6 @@ Script: models.py
 Role: Database Schema for Health Passport
 Author: Member 3 (Backend Lead)
 """
-import sqlite3
 import os
 
 # Define the database path in the root directory for easy access
@@ -11,7 +10,8 @@ DB_PATH = os.path.join(os.getcwd(), "lifeline_identity.db")
 
 def init_db():
     """Initializes the SQLite database and creates the User table."""
-    conn = sqlite3.connect(DB_PATH)
+    from .connection import get_connection  # connection.py imports DB_PATH from here
+    conn = get_connection()
     cursor = conn.cursor()
     
     # We store name, age, blood type, and critical medical alerts
@@ -25,9 +25,15 @@ def init_db():
             allergies TEXT,
             chronic_conditions TEXT,
             emergency_contact TEXT,
-            qr_token TEXT UNIQUE
+            qr_token TEXT UNIQUE,
+            preferred_language TEXT
         );
     ''')
+
+    # Migrate databases created before the language hint column existed
+    cursor.execute("PRAGMA table_info(users)")
+    if "preferred_language" not in [col[1] for col in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE users ADD COLUMN preferred_language TEXT")
     
     # Create Vitals Table for rPPG History
     cursor.execute('''
@@ -41,7 +47,6 @@ def init_db():
     ''')
     
     conn.commit()
-    conn.close()
     print(f"✅ Database initialized at: {DB_PATH}")
 
 if __name__ == "__main__":
@@ -0,0 +1,152 @@
+"""
+Script: vitals_buffer.py
+Role: Write-Behind Vitals Ingestion Queue
+Author: Member 3 (Backend Lead)
+Description: log_vital used to commit one row per BPM reading, i.e. one fsync per
+frame per patient. Readings now go into an in-memory queue shared by all
+sessions; a writer thread inserts them with executemany in a single transaction
+every FLUSH_INTERVAL_MS or as soon as FLUSH_ROWS are pending. The queue is
+bounded (producers wait for the writer once MAX_PENDING rows are queued), and is
+flushed on shutdown; the next row after a stop starts a new writer, so an app
+restarted in the same process keeps group commit. Each row keeps the time it was
+logged, not the flush time.
+
+Durability knob (LIFELINE_VITALS_DURABILITY):
+    batched    Group commit (default). A crash loses at most one flush interval.
+    immediate  Every reading is committed before log_vital returns (old behaviour).
+"""
+
+import atexit
+import os
+import threading
+import time
+
+from .connection import get_connection
+
+FLUSH_INTERVAL_MS = int(os.getenv("LIFELINE_VITALS_FLUSH_MS", 250))
+FLUSH_ROWS = int(os.getenv("LIFELINE_VITALS_FLUSH_ROWS", 500))
+MAX_PENDING = int(os.getenv("LIFELINE_VITALS_MAX_PENDING", 20000))
+
+DURABILITY = os.getenv("LIFELINE_VITALS_DURABILITY", "batched").lower()
+if DURABILITY not in ("batched", "immediate"):
+    raise ValueError(f"Invalid LIFELINE_VITALS_DURABILITY '{DURABILITY}'")
+
+INSERT_VITAL = "INSERT INTO vitals (user_token, bpm, timestamp) VALUES (?, ?, ?)"
+
+
+def _utc_now():
+    # Same format as the column's DEFAULT CURRENT_TIMESTAMP
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
+def _write_rows(rows):
+    conn = get_connection()
+    try:
+        with conn:
+            conn.executemany(INSERT_VITAL, rows)
+        return True
+    except Exception as e:
+        print(f"❌ Vitals Log Error ({len(rows)} rows): {e}")
+        return False
+
+
+class VitalsWriteBuffer:
+    """
+    Thread-safe group-commit queue for vitals rows. The writer thread starts on
+    the first add(); while stop() drains it, add() writes through synchronously.
+    """
+
+    def __init__(self, flush_interval_ms=FLUSH_INTERVAL_MS, flush_rows=FLUSH_ROWS, max_pending=MAX_PENDING,
+                 durability=DURABILITY):
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.flush_rows = flush_rows
+        self.max_pending = max_pending
+        self.durability = durability
+        self._rows = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.waits = 0  # add() calls that had to wait for room
+
+    def add(self, token, bpm):
+        row = (token, float(bpm), _utc_now())
+        if self.durability == "immediate":
+            self._write([row])
+            return
+        with self._cond:
+            if len(self._rows) >= self.max_pending and not self._closed:
+                self.waits += 1
+                while len(self._rows) >= self.max_pending and not self._closed:
+                    self._cond.wait()
+            # Checked after the wait: a producer woken by stop() must not queue
+            # behind a writer that has already taken its last batch
+            write_through = self._closed
+            if not write_through:
+                self._rows.append(row)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="vitals-writer", daemon=True)
+                    self._thread.start()
+                if len(self._rows) == 1 or len(self._rows) >= self.flush_rows:
+                    self._cond.notify_all()
+        if write_through:
+            self._write([row])
+
+    def stop(self):
+        """Flushes what is pending and stops the writer (app shutdown). A later add() starts a new one."""
+        with self._cond:
+            self._closed = True
+            thread = self._thread
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+        with self._cond:
+            self._closed = False
+            self._thread = None
+
+    def stats(self):
+        with self._cond:
+            return {
+                "durability": self.durability,
+                "pending": len(self._rows),
+                "written": self.written,
+                "batches": self.batches,
+                "failed": self.failed,
+                "producer_waits": self.waits,
+            }
+
+    def _write(self, rows):
+        ok = _write_rows(rows)
+        with self._cond:
+            if ok:
+                self.written += len(rows)
+                self.batches += 1
+            else:
+                self.failed += len(rows)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._rows and not self._closed:
+                    self._cond.wait()
+                # Group commit: give other sessions' readings until the deadline to join the batch
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._rows) < self.flush_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._rows = self._rows, []
+                stopping = self._closed
+                self._cond.notify_all()  # Room for producers waiting on a full queue
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+
+
+vitals_buffer = VitalsWriteBuffer()
+# Scripts that log vitals outside the app still get their rows written
+atexit.register(vitals_buffer.stop)
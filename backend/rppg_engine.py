@@ -1,8 +1,135 @@
 import cv2
+import time
 import numpy as np
 import mediapipe as mp
 import scipy.signal as signal
-from collections import deque
+
+# Pulse band: 0.7 Hz - 4.0 Hz corresponds to 42 BPM - 240 BPM
+BAND_LOW_HZ = 0.7
+BAND_HIGH_HZ = 4.0
+
+# Signal-quality index: per-frame penalties on the ROI means and landmarks
+QUALITY_MOTION_LIMIT = 0.05   # Mean landmark shift per frame, as a fraction of ROI width, scoring 0
+QUALITY_LIGHT_LIMIT = 0.05    # Relative frame-to-frame jump of the ROI mean scoring 0
+QUALITY_SATURATION = (5, 250) # ROI means outside this range are clipped (too dark/bright)
+QUALITY_WINDOW_SECONDS = 2.0  # EWMA span of the quality index
+
+# Timestamped input: gaps longer than this restart the signal instead of being interpolated
+MAX_SAMPLE_GAP_SECONDS = 1.0
+
+# Approximate resident memory of one FaceMesh graph (measured: ~21 MB per instance)
+FACE_MESH_BYTES = 24 * 1024 * 1024
+
+
+class SpectralPlan:
+    """
+    Filter and FFT design for one (fps, buffer_size), shared by every engine
+    with those settings so nothing is recomputed per BPM update. A larger
+    `fft_size` zero-pads the window, interpolating the spectrum for the short
+    windows used by early estimates.
+    """
+    
+    def __init__(self, fps, buffer_size, fft_size=None):
+        self.fps = fps
+        self.buffer_size = buffer_size
+        self.fft_size = fft_size or buffer_size
+        
+        # 2nd order Butterworth band-pass
+        nyquist = 0.5 * fps
+        self.b, self.a = signal.butter(2, [BAND_LOW_HZ / nyquist, BAND_HIGH_HZ / nyquist], btype='band')
+        
+        self.freqs = np.fft.rfftfreq(self.fft_size, 1.0 / fps)
+        self.band_mask = (self.freqs >= BAND_LOW_HZ) & (self.freqs <= BAND_HIGH_HZ)
+        self.band_freqs = self.freqs[self.band_mask]
+        
+        # Mean removal, filtfilt and the in-band rfft bins are all linear in the
+        # signal, so they fold into one (bins x samples) matrix:
+        #   band_spectrum = operator @ raw_signal
+        # Column j is the pipeline's response to a unit sample at position j.
+        centering = np.eye(buffer_size) - 1.0 / buffer_size
+        filtered = signal.filtfilt(self.b, self.a, centering, axis=0)
+        self.operator = np.ascontiguousarray(np.fft.rfft(filtered, n=self.fft_size, axis=0)[self.band_mask])
+        
+        if self.fft_size != buffer_size:
+            return  # Zero-padded plans only serve the batch FFT path
+        
+        # Sliding-DFT estimator: causal IIR version of the same band-pass, as
+        # plain-float biquads (cheaper than NumPy calls for one sample), plus
+        # the per-bin rotation e^{j2*pi*k/N} and an exact DFT for periodic resync
+        sos = signal.butter(2, [BAND_LOW_HZ / nyquist, BAND_HIGH_HZ / nyquist], btype='band', output='sos')
+        self.sos_coeffs = [tuple(float(c) for c in section) for section in sos]
+        self.sos_zi = signal.sosfilt_zi(sos)
+        band_bins = np.flatnonzero(self.band_mask)
+        self.sdft_twiddle = np.exp(2j * np.pi * band_bins / buffer_size)
+        self.band_dft = np.ascontiguousarray(
+            np.exp(-2j * np.pi * np.outer(band_bins, np.arange(buffer_size)) / buffer_size)
+        )
+
+
+_SPECTRAL_PLANS = {}
+
+def get_spectral_plan(fps, buffer_size, fft_size=None):
+    """Returns the cached SpectralPlan for (fps, buffer_size, fft_size), building it once."""
+    key = (fps, buffer_size, fft_size or buffer_size)
+    plan = _SPECTRAL_PLANS.get(key)
+    if plan is None:
+        plan = _SPECTRAL_PLANS[key] = SpectralPlan(fps, buffer_size, fft_size)
+    return plan
+
+
+class SpectralBatchScheduler:
+    """
+    Cross-session BPM analysis. Engines due for an update submit themselves;
+    each tick stacks their buffers into one 2-D array per SpectralPlan and runs
+    the whole detrend + filter + FFT pipeline as a single matrix product, then
+    hands every engine its new BPM. Not thread-safe: submit and tick from the
+    same thread (e.g. the event loop).
+    """
+    
+    def __init__(self):
+        self._due = {}  # id(engine) -> engine; an engine is analysed once per tick
+        self.ticks = 0
+        self.analysed = 0
+    
+    def submit(self, engine):
+        self._due[id(engine)] = engine
+    
+    def pending(self):
+        """Engines waiting for the next tick (a backlog here means ticks cannot keep up)."""
+        return len(self._due)
+    
+    def run_tick(self):
+        """Analyses every submitted engine. Returns how many were updated."""
+        if not self._due:
+            return 0
+        due, self._due = self._due, {}
+        
+        groups = {}
+        for engine in due.values():
+            # Full buffers share the engine's plan; filling ones use the early plan for
+            # their current window. Engines cleared (face lost) since submitting get None.
+            plan = engine._analysis_plan()
+            if plan is not None:
+                groups.setdefault(id(plan), (plan, []))[1].append(engine)
+        
+        updated = 0
+        for plan, engines in groups.values():
+            if len(plan.band_freqs) == 0:
+                continue
+            signals = np.empty((len(engines), plan.buffer_size))
+            for row, engine in zip(signals, engines):
+                engine._recent_signal(plan.buffer_size, out=row)
+            # (sessions x samples) @ (samples x bins): every session's band spectrum at once
+            magnitude = np.abs(signals @ plan.operator.T)
+            bpms = plan.band_freqs[np.argmax(magnitude, axis=1)] * 60.0
+            for engine, bpm in zip(engines, bpms):
+                engine._apply_bpm(bpm, plan.buffer_size)
+            updated += len(engines)
+        
+        self.ticks += 1
+        self.analysed += updated
+        return updated
+
 
 class RPPGHeartRateEngine:
     """
@@ -14,7 +141,10 @@ class RPPGHeartRateEngine:
     filtering, FFT) to isolate the pulse signal.
     """
     
-    def __init__(self, buffer_size=300, fps=30):
+    ESTIMATORS = ("fft", "sdft")
+    
+    def __init__(self, buffer_size=300, fps=30, estimator="fft", scheduler=None, detect_interval=1,
+                 landmark_scale="auto", landmarks=True, early_seconds=3.5, min_quality=0.5, max_num_faces=1):
         """
         Initialize the RPPG engine.
         
@@ -23,20 +153,69 @@ class RPPGHeartRateEngine:
                                Default is 300 (approx. 10 seconds at 30 FPS).
             fps (int): The expected frame rate of the input video stream.
                        Default is 30.
+            estimator (str): "fft" recomputes filtfilt + FFT every `calc_interval`
+                             frames. "sdft" band-passes each sample with an IIR
+                             filter and updates the in-band DFT bins incrementally,
+                             giving a fresh BPM on every frame.
+            scheduler (SpectralBatchScheduler, optional): If given, "fft" updates
+                             are deferred to the scheduler's next tick and batched
+                             with other sessions; `last_bpm` updates then.
+            detect_interval (int): Run FaceMesh every N frames and track the
+                             forehead points with optical flow in between
+                             (FaceMesh also runs whenever tracking fails).
+                             Default is 1 (FaceMesh on every frame).
+            landmark_scale ("auto" or float): Scale of the copy FaceMesh runs on;
+                             the green channel is always sampled at full resolution.
+                             "auto" picks it from the frame size and the measured
+                             FaceMesh latency. 1.0 disables downscaling.
+            landmarks (bool): False builds a signal-only engine without FaceMesh,
+                             for clients that compute the ROI means themselves
+                             and send them to process_sample().
+            early_seconds (float): Signal length after which provisional BPMs are
+                             emitted while the buffer fills, from the window
+                             collected so far (zero-padded FFT). `last_confidence`
+                             grows from ~0.35 to 1.0 as the buffer fills.
+                             None waits for the full buffer.
+            min_quality (float): BPM updates are skipped (last_bpm is held) while
+                             the signal-quality index `signal_quality` is below
+                             this. None disables the gate.
+            max_num_faces (int): Faces FaceMesh looks for. This engine follows the
+                             first one; MultiFaceRPPGEngine uses them all.
         """
+        if estimator not in self.ESTIMATORS:
+            raise ValueError(f"Unknown estimator '{estimator}', expected one of {self.ESTIMATORS}")
         self.buffer_size = buffer_size
         self.fps = fps
-        self.signal_buffer = deque(maxlen=buffer_size)
+        self.estimator = estimator
+        self.scheduler = scheduler
+        
+        # Preallocated ring buffer for the ROI signal plus scratch arrays, so the
+        # BPM update path does not allocate
+        self._plan = get_spectral_plan(fps, buffer_size)
+        self._ring = np.zeros(buffer_size)
+        self._ring_pos = 0    # Next write index
+        self._ring_count = 0  # Valid samples (<= buffer_size)
+        self._ordered = np.empty(buffer_size)
+        self._spectrum = np.empty(len(self._plan.band_freqs), dtype=np.complex128)
+        self._magnitude = np.empty(len(self._plan.band_freqs))
+        
+        # Sliding-DFT state: IIR biquad states, band-passed ring and running bins
+        self._iir_state = None
+        self._filtered_ring = np.zeros(buffer_size)
+        self._sdft_bins = np.zeros(len(self._plan.band_freqs), dtype=np.complex128)
+        self._sdft_samples = 0  # Samples since the last exact resync
         
         # Initialize MediaPipe Face Mesh
         self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        self.face_mesh = None
+        if landmarks:
+            self.face_mesh = self.mp_face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=max_num_faces,
+                refine_landmarks=True,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
         
         # Forehead landmarks indices (MediaPipe Face Mesh)
         # These indices cover the central forehead region, which is rich in blood perfusion 
@@ -47,122 +226,658 @@ class RPPGHeartRateEngine:
         self.calc_interval = 15  # Calculate BPM every 15 frames (approx 0.5s at 30fps)
         self.frame_counter = 0
         self.last_bpm = None
+        self.last_confidence = None  # Fraction of the full window behind last_bpm
+        
+        # Early estimates: windows are whole multiples of calc_interval (so only a few
+        # plans get built), zero-padded to the next power of two >= 2x the buffer
+        self.early_min_samples = None
+        if early_seconds is not None:
+            self.early_min_samples = max(self.calc_interval, int(early_seconds * fps))
+        self.early_fft_size = 1 << int(np.ceil(np.log2(2 * buffer_size)))
+        
+        # Signal-quality index in [0, 1]: EWMA of per-frame motion, lighting-jump and
+        # saturation scores, all O(1) from the ROI mean and forehead points
+        self.min_quality = min_quality
+        self.signal_quality = None
+        self.skipped_updates = 0  # BPM updates suppressed by the quality gate
+        self._quality_alpha = 2.0 / (QUALITY_WINDOW_SECONDS * fps + 1)
+        self._quality_prev_value = None
+        self._quality_prev_points = None
+        
+        # Resampler for timestamped input: samples are linearly interpolated onto a
+        # uniform 1/fps grid, so the buffer stays evenly spaced whatever the arrival jitter
+        self._grid_start = None  # Time of grid sample 0
+        self._grid_index = 0     # Next grid sample to emit
+        self._last_timed = None  # (timestamp, value) of the previous input sample
         self.no_face_frames = 0
         self.max_no_face_frames = 30 # Clear buffer after 1 second of no face
+        
+        # ROI sampling: the mask only covers the forehead bounding box and is
+        # re-rasterized only when a landmark moves more than `roi_cache_tolerance` px
+        self.roi_cache_tolerance = 1
+        self._mask_buffer = np.zeros((64, 128), dtype=np.uint8)
+        self._roi_points = None
+        self._roi_bbox = None
+        self._roi_mask = None
+        
+        # Landmark tracking between FaceMesh detections
+        self.detect_interval = max(1, int(detect_interval))
+        self.track_margin = 24      # Pixels of context around the forehead for optical flow
+        self.max_track_error = 20.0 # Median LK error above which FaceMesh runs again
+        self.detections = 0         # FaceMesh runs that found a face
+        self.tracked_frames = 0     # Frames served by optical flow instead
+        self._reset_tracking()
+        
+        # Resolution-adaptive landmark detection ("auto" keeps the long side of the
+        # FaceMesh input between the min/max, shrinking it while detection is over budget)
+        self.landmark_scale = landmark_scale
+        self.landmark_target_side = 640
+        self.landmark_min_side = 256
+        self.landmark_max_side = 960
+        self.detect_budget_ms = 15.0
+        self.detect_ms = None  # Moving average of FaceMesh latency
+        self.last_landmark_scale = 1.0
 
-    def process_frame(self, frame_bgr):
+    def process_frame(self, frame_bgr, timestamp=None):
         """
         Process a single BGR frame to estimate heart rate.
         
         Args:
             frame_bgr (numpy.ndarray): Input video frame in BGR format.
+            timestamp (float, optional): Capture time in seconds. With timestamps,
+                             frames may arrive at any (variable) rate: the signal is
+                             resampled onto the engine's `fps` grid. Without, each
+                             frame is assumed to be exactly 1/fps after the last.
             
         Returns:
             float or None: Estimated Heart Rate in BPM (Beats Per Minute), 
                            or None if the buffer is not full or no face is detected.
         """
+        if self.face_mesh is None:
+            raise RuntimeError("Engine was built with landmarks=False; use process_sample()")
         if frame_bgr is None:
             return self.last_bpm
 
-        # Convert BGR to RGB for MediaPipe
-        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(frame_rgb)
+        # Between FaceMesh runs, follow the forehead points with optical flow
+        roi_points = None
+        if self.detect_interval > 1 and self._frames_since_detect < self.detect_interval:
+            roi_points = self._track_forehead(frame_bgr)
         
-        if not results.multi_face_landmarks:
-            self.no_face_frames += 1
-            if self.no_face_frames > self.max_no_face_frames:
-                self.signal_buffer.clear()
-                self.last_bpm = None
-                self.no_face_frames = 0 # Reset counter after clearing
-            return self.last_bpm
+        if roi_points is None:
+            roi_points = self._detect_forehead(frame_bgr)
+            
+            if roi_points is None:
+                self._reset_tracking()
+                self.no_face_frames += 1
+                if self.no_face_frames > self.max_no_face_frames:
+                    self._clear_signal()
+                    self.last_bpm = None
+                    self.last_confidence = None
+                    self.no_face_frames = 0 # Reset counter after clearing
+                return self.last_bpm
+            self.detections += 1
+            self._frames_since_detect = 0
+        else:
+            self.tracked_frames += 1
             
         # Face found, reset counter
         self.no_face_frames = 0
+        self._frames_since_detect += 1
+        if self.detect_interval > 1:
+            self._update_tracking(frame_bgr, roi_points)
+        
+        # Compute the mean intensity within the ROI
+        # storage order is BGR, so Green is at index 1
+        roi_mean = self._sample_roi(frame_bgr, roi_points.astype(np.int32))
+        if roi_mean is None:
+            return self.last_bpm
+        mean_green = roi_mean[1]
+        
+        return self._push_timed(timestamp, mean_green, self._landmark_motion(roi_points))
+
+    def process_sample(self, sample, timestamp=None):
+        """
+        Edge mode: feeds one ROI mean computed on the client, skipping FaceMesh
+        and ROI sampling entirely.
+        
+        Args:
+            sample (float or sequence): Mean green value, or an (R, G, B) mean.
+            timestamp (float, optional): Capture time in seconds (see process_frame).
             
-        # Get the first detected face
-        face_landmarks = results.multi_face_landmarks[0]
+        Returns:
+            float or None: Estimated BPM, or None while the buffer is filling.
+        """
+        if not np.isscalar(sample):
+            sample = sample[1]  # Green is the middle channel in RGB and BGR alike
+        return self._push_timed(timestamp, float(sample))
+
+    def memory_bytes(self):
+        """Rough footprint of this engine: its buffers plus FaceMesh, if it has one."""
+        arrays = (self._ring, self._ordered, self._spectrum, self._magnitude, self._filtered_ring,
+                  self._sdft_bins, self._mask_buffer, self._track_gray)
+        total = sum(a.nbytes for a in arrays if a is not None)
+        return total + (FACE_MESH_BYTES if self.face_mesh is not None else 0)
+
+    def close(self):
+        """Releases the FaceMesh graph (if any)."""
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+            self.face_mesh = None
+
+    def _detect_forehead(self, frame_bgr):
+        """
+        Runs FaceMesh and returns the forehead polygon as (N, 2) float32 pixel
+        coordinates, or None if no face is found.
+        """
+        foreheads = self._detect_foreheads(frame_bgr)
+        return foreheads[0] if foreheads else None
+
+    def _detect_foreheads(self, frame_bgr):
+        """One FaceMesh pass; the forehead polygon of every face found (possibly empty)."""
         h, w, _ = frame_bgr.shape
         
-        # Extract forehead ROI points
-        roi_points = []
-        for idx in self.forehead_indices:
-            lm = face_landmarks.landmark[idx]
-            x, y = int(lm.x * w), int(lm.y * h)
-            roi_points.append([x, y])
+        # Landmarks are normalized, so FaceMesh can run on a smaller copy while
+        # the points below still map onto the full-resolution frame
+        scale = self._landmark_scale_for(w, h)
+        self.last_landmark_scale = scale
+        small = frame_bgr
+        if scale < 1.0:
+            small = cv2.resize(frame_bgr, (max(1, round(w * scale)), max(1, round(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+        
+        # Convert BGR to RGB for MediaPipe
+        start = time.perf_counter()
+        frame_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        results = self.face_mesh.process(frame_rgb)
+        self._record_detect_latency((time.perf_counter() - start) * 1000)
+        
+        if not results.multi_face_landmarks:
+            return []
+        
+        # Extract forehead ROI points of each face
+        foreheads = []
+        for face_landmarks in results.multi_face_landmarks:
+            roi_points = []
+            for idx in self.forehead_indices:
+                lm = face_landmarks.landmark[idx]
+                roi_points.append([int(lm.x * w), int(lm.y * h)])
+            foreheads.append(np.array(roi_points, dtype=np.float32))
             
-        roi_points = np.array(roi_points, dtype=np.int32)
+        return foreheads
+
+    def _landmark_scale_for(self, w, h):
+        """Downscale factor for the FaceMesh input of a w x h frame."""
+        if self.landmark_scale != "auto":
+            return min(1.0, float(self.landmark_scale))
+        return min(1.0, self.landmark_target_side / max(w, h))
+
+    def _record_detect_latency(self, ms):
+        """Updates the FaceMesh latency average and, in auto mode, the target input size."""
+        self.detect_ms = ms if self.detect_ms is None else 0.8 * self.detect_ms + 0.2 * ms
+        if self.landmark_scale != "auto":
+            return
+        if self.detect_ms > self.detect_budget_ms:
+            self.landmark_target_side = max(self.landmark_min_side, int(self.landmark_target_side * 0.8))
+        elif self.detect_ms < 0.5 * self.detect_budget_ms:
+            self.landmark_target_side = min(self.landmark_max_side, int(self.landmark_target_side * 1.1))
+
+    def _update_tracking(self, frame_bgr, roi_points):
+        """Stores the grey patch around the forehead that the next frame is tracked from."""
+        h, w = frame_bgr.shape[:2]
+        x0, y0 = np.maximum(roi_points.min(axis=0).astype(int) - self.track_margin, 0)
+        x1, y1 = np.minimum(roi_points.max(axis=0).astype(int) + self.track_margin + 1, (w, h))
+        if x1 <= x0 or y1 <= y0:
+            self._reset_tracking()
+            return
+        self._track_region = (int(x0), int(y0), int(x1), int(y1), h, w)
+        self._track_gray = cv2.cvtColor(frame_bgr[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+        self._track_points = roi_points.astype(np.float32)
+
+    def _track_forehead(self, frame_bgr):
+        """
+        Propagates the last forehead polygon into this frame with pyramidal
+        Lucas-Kanade flow inside the stored patch. Returns None (forcing a
+        FaceMesh run) if there is nothing to track or tracking looks unreliable.
+        """
+        if self._track_gray is None:
+            return None
+        x0, y0, x1, y1, h, w = self._track_region
+        if frame_bgr.shape[:2] != (h, w):
+            return None
         
-        # Create a mask for the ROI
-        mask = np.zeros((h, w), dtype=np.uint8)
-        cv2.fillConvexPoly(mask, roi_points, 1)
+        gray = cv2.cvtColor(frame_bgr[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY)
+        origin = np.array([x0, y0], dtype=np.float32)
+        prev_pts = (self._track_points - origin).reshape(-1, 1, 2)
+        next_pts, status, error = cv2.calcOpticalFlowPyrLK(
+            self._track_gray, gray, prev_pts, None, winSize=(21, 21), maxLevel=2
+        )
+        if next_pts is None or not status.all() or float(np.median(error)) > self.max_track_error:
+            return None
+        return next_pts.reshape(-1, 2) + origin
+
+    def _reset_tracking(self):
+        self._track_gray = None
+        self._track_points = None
+        self._track_region = None
+        self._frames_since_detect = 0
+
+    def _landmark_motion(self, roi_points):
+        """Mean forehead point shift since the last frame, as a fraction of the ROI width."""
+        prev, self._quality_prev_points = self._quality_prev_points, roi_points
+        if prev is None or prev.shape != roi_points.shape:
+            return 0.0
+        width = max(float(np.ptp(roi_points[:, 0])), 1.0)
+        return float(np.abs(roi_points - prev).mean()) / width
+
+    def _update_quality(self, value, motion):
+        """Folds one frame's motion, lighting-jump and saturation scores into `signal_quality`."""
+        prev, self._quality_prev_value = self._quality_prev_value, value
+        low, high = QUALITY_SATURATION
+        if not low <= value <= high:
+            score = 0.0
+        else:
+            light = abs(value - prev) / max(prev, 1.0) if prev is not None else 0.0
+            score = max(0.0, 1.0 - motion / QUALITY_MOTION_LIMIT) * max(0.0, 1.0 - light / QUALITY_LIGHT_LIMIT)
+        if self.signal_quality is None:
+            self.signal_quality = score
+        else:
+            self.signal_quality += self._quality_alpha * (score - self.signal_quality)
+
+    def quality_report(self):
+        """{"index": signal_quality rounded (None before any sample), "ok": passes the gate}."""
+        q = self.signal_quality
+        return {
+            "index": None if q is None else round(q, 2),
+            "ok": q is not None and (self.min_quality is None or q >= self.min_quality),
+        }
+
+    def _quality_ok(self):
+        """Quality gate for BPM updates; counts the updates it suppresses."""
+        if self.min_quality is None or self.signal_quality >= self.min_quality:
+            return True
+        self.skipped_updates += 1
+        return False
+
+    def _push_timed(self, timestamp, value, motion=0.0):
+        """
+        Resamples timestamped input onto the uniform grid: emits every grid sample
+        up to `timestamp`, interpolated between the previous input and this one.
+        Untimed input goes straight to _push_sample.
+        """
+        if timestamp is None:
+            return self._push_sample(value, motion)
+        if not np.isfinite(timestamp):
+            # A NaN would compare false against every later timestamp and stall the grid
+            raise ValueError(f"timestamp must be a finite number, got {timestamp}")
         
-        # Extract the green channel and compute the mean intensity within the ROI
-        # storage order is BGR, so Green is at index 1
-        green_channel = frame_bgr[:, :, 1]
-        mean_green = cv2.mean(green_channel, mask=mask)[0]
+        last = self._last_timed
+        if last is not None and timestamp <= last[0]:
+            return self.last_bpm  # Duplicate or out of order
+        if last is None or timestamp - last[0] > MAX_SAMPLE_GAP_SECONDS:
+            if last is not None:
+                self._clear_signal()  # Too long a gap to interpolate across
+            self._grid_start = timestamp
+            self._grid_index = 0
+            last = (timestamp, value)
+        
+        t0, v0 = last
+        span = timestamp - t0
+        period = 1.0 / self.fps
+        # Grid times are start + k/fps (not accumulated), so rounding never drifts
+        grid_t = self._grid_start + self._grid_index * period
+        while grid_t <= timestamp:
+            frac = (grid_t - t0) / span if span > 0 else 1.0
+            self._push_sample(v0 + (value - v0) * frac, motion)
+            self._grid_index += 1
+            grid_t = self._grid_start + self._grid_index * period
+        
+        self._last_timed = (timestamp, value)
+        return self.last_bpm
+
+    def _push_sample(self, value, motion=0.0):
+        """
+        Signal-processing half of the engine: buffers one ROI sample and updates
+        the BPM estimate when due (and when the signal quality allows).
         
+        Returns:
+            float or None: Current BPM (provisional while the buffer fills, see
+                           `last_confidence`), or None until the first estimate.
+        """
         # Add to buffer
-        self.signal_buffer.append(mean_green)
+        if self.estimator == "sdft":
+            self._sdft_update(value)
+        self._append_sample(value)
+        self._update_quality(value, motion)
         self.frame_counter += 1
         
         # Check if buffer is full enough to process
-        if len(self.signal_buffer) < self.buffer_size:
-            return None
-            
-        # Optimization: Only calculate BPM every `calc_interval` frames
-        if self.frame_counter % self.calc_interval == 0:
-            bpm = self._calculate_heart_rate()
+        if self._ring_count < self.buffer_size:
+            if self.early_min_samples is not None and self._ring_count >= self.early_min_samples \
+                    and self.frame_counter % self.calc_interval == 0 and self._quality_ok():
+                self._update_estimate()
+            return self.last_bpm
+        
+        if self.estimator == "sdft":
+            # Bins are always current, so every frame gets a fresh estimate
+            if not self._quality_ok():
+                return self.last_bpm
+            bpm = self._sdft_heart_rate()
             if bpm is not None:
                 self.last_bpm = bpm
+                self.last_confidence = 1.0
+            return self.last_bpm
+            
+        # Optimization: Only calculate BPM every `calc_interval` frames
+        if self.frame_counter % self.calc_interval == 0 and self._quality_ok():
+            self._update_estimate()
                 
         return self.last_bpm
 
-    def _calculate_heart_rate(self):
+    def _update_estimate(self):
+        """Runs the FFT analysis now, or hands it to the batch scheduler."""
+        if self.scheduler is not None:
+            self.scheduler.submit(self)
+        else:
+            bpm = self._calculate_heart_rate()
+            if bpm is not None:
+                self._apply_bpm(bpm, self._analysis_plan().buffer_size)
+
+    def _analysis_plan(self):
+        """Plan for the current buffer: the full one, an early zero-padded one, or None."""
+        if self._ring_count == self.buffer_size:
+            return self._plan
+        if self.early_min_samples is None or self._ring_count < self.early_min_samples:
+            return None
+        window = self._ring_count - self._ring_count % self.calc_interval
+        return get_spectral_plan(self.fps, window, self.early_fft_size)
+
+    def _apply_bpm(self, bpm, window=None):
+        """Accepts a BPM over the last `window` samples (same sanity check as inline)."""
+        if 40 <= bpm <= 200:
+            self.last_bpm = float(bpm)
+            self.last_confidence = round((window or self.buffer_size) / self.buffer_size, 2)
+
+    def _append_sample(self, value):
+        """Writes one ROI sample into the ring buffer, overwriting the oldest."""
+        self._ring[self._ring_pos] = value
+        self._ring_pos = (self._ring_pos + 1) % self.buffer_size
+        if self._ring_count < self.buffer_size:
+            self._ring_count += 1
+
+    def _clear_signal(self):
+        self._ring_pos = 0
+        self._ring_count = 0
+        self.signal_quality = None
+        self._quality_prev_value = None
+        self._quality_prev_points = None
+        self._grid_start = None
+        self._last_timed = None
+        self._iir_state = None
+        self._sdft_bins.fill(0)
+        self._filtered_ring.fill(0)
+        self._sdft_samples = 0
+
+    def _sdft_update(self, value):
         """
-        Perform signal processing to extract heart rate from the buffered signal.
+        Band-passes one sample (IIR, transposed direct form II) and slides the
+        in-band DFT bins by one sample:  X_k <- (X_k - x_old + x_new) * e^{j2*pi*k/N}.
+        Must run before the sample is written to the ring, so `_ring_pos` still
+        points at the slot being overwritten.
+        """
+        plan = self._plan
+        if self._iir_state is None:
+            # Start in steady state for the first sample to avoid a DC step transient
+            self._iir_state = [[float(z0 * value), float(z1 * value)] for z0, z1 in plan.sos_zi]
         
-        Returns:
-            float or None: Calculated BPM, or None if signal is too noisy/invalid.
+        y = value
+        for (b0, b1, b2, _, a1, a2), state in zip(plan.sos_coeffs, self._iir_state):
+            out = b0 * y + state[0]
+            state[0] = b1 * y - a1 * out + state[1]
+            state[1] = b2 * y - a2 * out
+            y = out
+        
+        oldest = self._filtered_ring[self._ring_pos]
+        self._filtered_ring[self._ring_pos] = y
+        self._sdft_samples += 1
+        
+        if self._sdft_samples >= self.buffer_size:
+            # Recompute the bins exactly once per window so rounding error cannot accumulate
+            pos = (self._ring_pos + 1) % self.buffer_size
+            split = self.buffer_size - pos
+            self._ordered[:split] = self._filtered_ring[pos:]
+            self._ordered[split:] = self._filtered_ring[:pos]
+            np.dot(plan.band_dft, self._ordered, out=self._sdft_bins)
+            self._sdft_samples = 0
+        else:
+            self._sdft_bins += y - oldest
+            self._sdft_bins *= plan.sdft_twiddle
+
+    def _sdft_heart_rate(self):
+        """BPM from the current sliding-DFT bins (see _calculate_heart_rate for the checks)."""
+        plan = self._plan
+        if len(plan.band_freqs) == 0:
+            return None
+        np.abs(self._sdft_bins, out=self._magnitude)
+        bpm = plan.band_freqs[np.argmax(self._magnitude)] * 60.0
+        if 40 <= bpm <= 200:
+            return float(bpm)
+        return None
+
+    def _ordered_signal(self, out=None):
+        """The full buffer oldest -> newest, written into `out` or a reused scratch array."""
+        if out is None:
+            out = self._ordered
+        split = self.buffer_size - self._ring_pos
+        out[:split] = self._ring[self._ring_pos:]
+        out[split:] = self._ring[:self._ring_pos]
+        return out
+
+    def _recent_signal(self, n, out=None):
+        """The newest `n` samples oldest -> newest (the whole buffer when n == buffer_size)."""
+        if n == self.buffer_size:
+            return self._ordered_signal(out)
+        if out is None:
+            out = self._ordered[:n]
+        start = self._ring_pos - n
+        if start >= 0:
+            out[:] = self._ring[start:self._ring_pos]
+        else:
+            out[:-start] = self._ring[start:]
+            out[-start:] = self._ring[:self._ring_pos]
+        return out
+
+    def _sample_roi(self, frame_bgr, roi_points):
         """
-        # Convert buffer to numpy array
-        raw_signal = np.array(self.signal_buffer)
+        Mean BGR intensity inside the ROI polygon, computed on the polygon's
+        bounding box only, so the cost scales with ROI size rather than frame size.
         
-        # 1. Detrending: Subtract the mean to center the signal
-        detrended_signal = raw_signal - np.mean(raw_signal)
+        Args:
+            frame_bgr (numpy.ndarray): Full BGR frame.
+            roi_points (numpy.ndarray): (N, 2) int32 polygon in frame pixel coordinates.
+            
+        Returns:
+            tuple or None: (B, G, R) means, or None if the ROI lies outside the frame.
+        """
+        h, w = frame_bgr.shape[:2]
         
-        # 2. Filtration: Apply Bandpass Filter (0.7 Hz - 4.0 Hz)
-        # This range corresponds to 42 BPM - 240 BPM
-        nyquist = 0.5 * self.fps
-        low = 0.7 / nyquist
-        high = 4.0 / nyquist
+        moved = (
+            self._roi_points is None
+            or self._roi_points.shape != roi_points.shape
+            or np.abs(roi_points - self._roi_points).max() > self.roi_cache_tolerance
+        )
+        if moved or self._roi_bbox[4:] != (h, w):
+            x0, y0 = np.maximum(roi_points.min(axis=0), 0)
+            x1, y1 = np.minimum(roi_points.max(axis=0) + 1, (w, h))
+            if x1 <= x0 or y1 <= y0:
+                self._roi_points = None
+                return None
+            
+            bh, bw = int(y1 - y0), int(x1 - x0)
+            if self._mask_buffer.shape[0] < bh or self._mask_buffer.shape[1] < bw:
+                self._mask_buffer = np.zeros(
+                    (max(bh, self._mask_buffer.shape[0]), max(bw, self._mask_buffer.shape[1])), dtype=np.uint8
+                )
+            mask = self._mask_buffer[:bh, :bw]
+            mask.fill(0)
+            cv2.fillConvexPoly(mask, roi_points - np.array([x0, y0], dtype=np.int32), 1)
+            
+            self._roi_points = roi_points
+            self._roi_bbox = (int(x0), int(y0), int(x1), int(y1), h, w)
+            self._roi_mask = mask
         
-        # Use a 2nd order Butterworth filter
-        b, a = signal.butter(2, [low, high], btype='band')
-        filtered_signal = signal.filtfilt(b, a, detrended_signal)
+        x0, y0, x1, y1 = self._roi_bbox[:4]
+        # Slicing keeps a view into the frame; OpenCV reads it with its row stride, no copy
+        return cv2.mean(frame_bgr[y0:y1, x0:x1], mask=self._roi_mask)[:3]
+
+    def _calculate_heart_rate(self):
+        """
+        Perform signal processing to extract heart rate from the buffered signal.
         
-        # 3. FFT: Find dominant frequency
-        # Use rfft for real-valued input, which is faster and returns positive frequencies
-        fft_spectrum = np.abs(np.fft.rfft(filtered_signal))
-        freqs = np.fft.rfftfreq(len(filtered_signal), 1.0 / self.fps)
+        Detrending, band-pass filtering (0.7 Hz - 4.0 Hz, zero-phase Butterworth)
+        and the FFT are applied in one step through the cached SpectralPlan operator.
         
-        # Find the peak frequency in the valid range
-        # Note: The filter already dampened frequencies outside 0.7-4.0 Hz, 
-        # but we strictly check the bounds for the peak selection as well.
-        valid_idx = np.where((freqs >= 0.7) & (freqs <= 4.0))
-        valid_spectrum = fft_spectrum[valid_idx]
-        valid_freqs = freqs[valid_idx]
+        While the buffer fills, the window collected so far is analysed with a
+        zero-padded early plan and `last_confidence` reflects its length.
         
-        if len(valid_spectrum) == 0:
+        Returns:
+            float or None: Calculated BPM, or None if signal is too noisy/invalid.
+        """
+        plan = self._analysis_plan()
+        if plan is None or len(plan.band_freqs) == 0:
             return None
-            
-        peak_idx = np.argmax(valid_spectrum)
-        dominant_freq = valid_freqs[peak_idx]
+        
+        # In-band spectrum of the detrended, filtered signal
+        if plan is self._plan:
+            np.dot(plan.operator, self._ordered_signal(), out=self._spectrum)
+            np.abs(self._spectrum, out=self._magnitude)
+            magnitude = self._magnitude
+        else:
+            magnitude = np.abs(plan.operator @ self._recent_signal(plan.buffer_size))
+        
+        # Find the peak frequency in the valid range
+        dominant_freq = plan.band_freqs[np.argmax(magnitude)]
         
         # Convert to BPM
         bpm = dominant_freq * 60.0
         
-        # 4. Sanity Check
+        # Sanity Check
         if 40 <= bpm <= 200:
             return float(bpm)
         else:
             return None
+
+
+class MultiFaceRPPGEngine:
+    """
+    Heart rates for several people in one camera stream (e.g. a waiting room).
+    
+    One FaceMesh pass per frame finds up to `max_faces` faces. Each face is
+    matched to a stable subject id by forehead position and feeds its own
+    signal-only RPPGHeartRateEngine; all subjects' FFT updates are then run as
+    one batched matrix product through a shared SpectralBatchScheduler.
+    """
+    
+    def __init__(self, max_faces=6, buffer_size=300, fps=30, landmark_scale="auto", max_missing_frames=30,
+                 match_distance=1.0):
+        """
+        Args:
+            max_faces (int): Most faces tracked at once.
+            buffer_size, fps, landmark_scale: As for RPPGHeartRateEngine.
+            max_missing_frames (int): A subject not seen for this many frames is dropped.
+            match_distance (float): Largest forehead centroid jump between frames,
+                             in forehead widths, still treated as the same person.
+        """
+        self.buffer_size = buffer_size
+        self.fps = fps
+        self.max_missing_frames = max_missing_frames
+        self.match_distance = match_distance
+        self.scheduler = SpectralBatchScheduler()
+        # Detection only: its own signal buffers stay unused
+        self.detector = RPPGHeartRateEngine(buffer_size=buffer_size, fps=fps, landmark_scale=landmark_scale,
+                                            max_num_faces=max_faces)
+        self.subjects = {}  # id -> {"engine", "centroid", "width", "missing"}
+        self._next_id = 1
+    
+    def process_frame(self, frame_bgr, timestamp=None):
+        """
+        Process one BGR frame (`timestamp`: capture time in seconds, optional).
+        
+        Returns:
+            dict: subject id -> {"bpm", "confidence", "quality", "bbox" (x0, y0, x1, y1)}
+                  for every subject seen in this frame.
+        """
+        foreheads = self.detector._detect_foreheads(frame_bgr)
+        assigned = self._match(foreheads)
+        
+        readings = {}
+        for subject_id, roi_points in assigned.items():
+            engine = self.subjects[subject_id]["engine"]
+            roi_mean = engine._sample_roi(frame_bgr, roi_points.astype(np.int32))
+            if roi_mean is not None:
+                engine._push_timed(timestamp, roi_mean[1], engine._landmark_motion(roi_points))
+        
+        # Every subject due for an update, in one batched spectrum computation
+        self.scheduler.run_tick()
+        
+        for subject_id, roi_points in assigned.items():
+            engine = self.subjects[subject_id]["engine"]
+            x0, y0 = roi_points.min(axis=0).astype(int)
+            x1, y1 = roi_points.max(axis=0).astype(int)
+            readings[subject_id] = {
+                "bpm": engine.last_bpm,
+                "confidence": engine.last_confidence if engine.last_bpm is not None else None,
+                "quality": engine.quality_report(),
+                "bbox": (int(x0), int(y0), int(x1), int(y1)),
+            }
+        return readings
+    
+    def close(self):
+        self.detector.close()
+        self.subjects.clear()
+    
+    def _match(self, foreheads):
+        """
+        Greedy nearest-centroid assignment of this frame's foreheads to subjects.
+        Unmatched foreheads become new subjects; unseen subjects age out.
+        """
+        assigned = {}
+        ids = list(self.subjects)
+        if foreheads and ids:
+            centroids = np.array([f.mean(axis=0) for f in foreheads])
+            known = np.array([self.subjects[i]["centroid"] for i in ids])
+            widths = np.array([self.subjects[i]["width"] for i in ids])
+            # (faces x subjects) distances in units of each subject's forehead width
+            dist = np.linalg.norm(centroids[:, None, :] - known[None, :, :], axis=2) / widths[None, :]
+            for flat in np.argsort(dist, axis=None):
+                face, subject = divmod(int(flat), len(ids))
+                if dist[face, subject] > self.match_distance:
+                    break
+                if face in assigned.values() or ids[subject] in assigned:
+                    continue
+                assigned[ids[subject]] = face
+        
+        matched_faces = set(assigned.values())
+        for face in range(len(foreheads)):
+            if face not in matched_faces:
+                subject_id = self._next_id
+                self._next_id += 1
+                self.subjects[subject_id] = {
+                    "engine": RPPGHeartRateEngine(buffer_size=self.buffer_size, fps=self.fps, landmarks=False,
+                                                  scheduler=self.scheduler),
+                    "missing": 0,
+                }
+                assigned[subject_id] = face
+        
+        for subject_id in list(self.subjects):
+            subject = self.subjects[subject_id]
+            if subject_id in assigned:
+                points = foreheads[assigned[subject_id]]
+                subject["centroid"] = points.mean(axis=0)
+                subject["width"] = max(float(np.ptp(points[:, 0])), 1.0)
+                subject["missing"] = 0
+            else:
+                subject["missing"] += 1
+                if subject["missing"] > self.max_missing_frames:
+                    del self.subjects[subject_id]
+        
+        return {subject_id: foreheads[face] for subject_id, face in assigned.items()}
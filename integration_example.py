@@ -40,7 +40,12 @@ def main():
         bpm = rppg.process_frame(frame)
         
         # Display the result on the frame
-        if bpm is not None:
+        if bpm is not None and rppg.last_confidence < 1.0:
+            # Provisional reading while the buffer fills
+            text = f"Heart Rate: ~{bpm:.0f} BPM ({rppg.last_confidence:.0%})"
+            color = (0, 200, 255) # Amber
+            print(f"\r{text}", end="")
+        elif bpm is not None:
             text = f"Heart Rate: {bpm:.1f} BPM"
             color = (0, 255, 0) # Green
             print(f"\r{text}", end="")
@@ -5,22 +5,68 @@ Author: AI Engineer (Member 2)
 Description: Connects transcription and extraction into a single workflow.
 """
 
-from .transcribe import transcribe_audio
+import threading
+import uuid
+from collections import OrderedDict
+
+from .transcribe import transcribe_adaptive
 from .extract import extract_symptoms
 
-def process_voice_note(file_path):
+# Refined (largest-tier) results of notes first served by a smaller tier.
+# Bounded so unclaimed results cannot grow memory forever.
+MAX_REFINED_RESULTS = 256
+_REFINED = OrderedDict()
+_REFINED_LOCK = threading.Lock()
+
+def _store_refined(result_id, payload, overwrite=True):
+    with _REFINED_LOCK:
+        if not overwrite and result_id in _REFINED:
+            return  # The refined result already landed
+        _REFINED[result_id] = payload
+        _REFINED.move_to_end(result_id)
+        while len(_REFINED) > MAX_REFINED_RESULTS:
+            _REFINED.popitem(last=False)
+
+def get_refined_result(result_id):
+    """Returns the refined result for a note, {"status": "pending"}, or None if unknown."""
+    with _REFINED_LOCK:
+        return _REFINED.get(result_id)
+
+def process_voice_note(file_path, queue_depth=None, language=None, arrival=None):
     """
     The Master Function for the Backend.
-    1. Audio -> English Text (Whisper)
+    1. Audio -> English Text (Whisper, tier chosen by current load)
     2. English Text -> Symptom Data (NLP)
+
+    If a smaller model tier served the note, a refined result from the
+    largest tier becomes available later via get_refined_result(result_id).
+    A `language` hint (e.g. the patient's stored language) skips detection.
+    `arrival` is the Whisper POLICY.arrive() handle taken when the request came in.
     """
     print(f"🔄 Processing audio: {file_path}")
-    
+    result_id = uuid.uuid4().hex
+
+    def on_upgrade(text, tier):
+        if text is None:
+            _store_refined(result_id, {"status": "dropped"})  # Skipped under sustained load
+            return
+        _store_refined(result_id, {
+            "status": "complete",
+            "transcribed_text": text,
+            "symptoms": extract_symptoms(text),
+            "model_tier": tier
+        })
+
     # --- Step 1: Transcribe ---
-    transcribed_text = transcribe_audio(file_path)
+    transcription = transcribe_adaptive(file_path, queue_depth=queue_depth, on_upgrade=on_upgrade, language=language,
+                                        arrival=arrival)
     
-    if isinstance(transcribed_text, dict) and "error" in transcribed_text:
-        return transcribed_text # Return the error if transcription fails
+    if "error" in transcription:
+        return transcription # Return the error if transcription fails
+
+    transcribed_text = transcription["text"]
+    if transcription["upgrade_scheduled"]:
+        _store_refined(result_id, {"status": "pending"}, overwrite=False)
 
     # --- Step 2: Extract ---
     symptom_data = extract_symptoms(transcribed_text)
@@ -29,7 +75,13 @@ def process_voice_note(file_path):
     # We include the raw text so the doctor can read it in the UI
     result = {
         "transcribed_text": transcribed_text,
-        "symptoms": symptom_data
+        "symptoms": symptom_data,
+        "model_tier": transcription["tier"],
+        "language": transcription["language"],
+        "language_probability": transcription["language_probability"],
+        "language_hinted": transcription["language_hinted"],
+        "result_id": result_id,
+        "refinement_pending": transcription["upgrade_scheduled"]
     }
     
     print("✅ Pipeline processing complete.")
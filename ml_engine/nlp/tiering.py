@@ -0,0 +1,134 @@
+"""
+Script: tiering.py
+Role: Load-Aware Whisper Model Tier Selection
+Author: AI Engineer (Member 2)
+Description: Picks the Whisper model size for each voice note from the current
+queue depth and a latency SLO, so a surge gets fast 'tiny' transcriptions
+instead of slow 'base' ones.
+
+Requests are counted as waiting from the moment they arrive (arrive()), not
+only once Whisper starts on them, so a backlog in front of the model pool is
+part of the queue depth.
+"""
+
+import threading
+
+# Initial real-time factors (compute seconds per second of audio) on CPU.
+# These are only priors - the policy replaces them with measured values.
+DEFAULT_RTF = {"tiny": 0.1, "base": 0.3, "small": 0.9, "medium": 2.5, "large": 5.0}
+FALLBACK_RTF = 0.5
+
+# Weight of the newest measurement in the moving average
+EWMA_ALPHA = 0.2
+
+
+class Arrival:
+    """A request counted as waiting until TierPolicy.start() or leave() claims it."""
+    __slots__ = ("waiting",)
+
+    def __init__(self):
+        self.waiting = True
+
+
+class TierPolicy:
+    """
+    Chooses a model tier per request and tracks in-flight transcriptions.
+
+    Tiers are ordered smallest -> largest. The largest tier whose estimated
+    latency (queued work + this clip) fits inside the SLO is chosen; when
+    nothing fits, the smallest tier is used.
+    """
+
+    def __init__(self, tiers, slo_seconds):
+        self.tiers = list(tiers)
+        self.slo_seconds = slo_seconds
+        self._rtf = {t: DEFAULT_RTF.get(t, FALLBACK_RTF) for t in self.tiers}
+        self._in_flight = 0
+        self._waiting = 0
+        self._background = 0
+        self._served = {t: 0 for t in self.tiers}
+        self._cond = threading.Condition()
+
+    @property
+    def top_tier(self):
+        return self.tiers[-1]
+
+    @property
+    def queue_depth(self):
+        with self._cond:
+            return self._in_flight + self._waiting
+
+    def arrive(self):
+        """Counts a request as waiting for Whisper. Pass the result to start(), then leave()."""
+        with self._cond:
+            self._waiting += 1
+        return Arrival()
+
+    def leave(self, arrival):
+        """Stops counting a request that never started (no-op once start() claimed it)."""
+        with self._cond:
+            self._claim(arrival)
+            self._cond.notify_all()
+
+    def start(self, audio_seconds, queue_depth=None, arrival=None):
+        """
+        Chooses the tier and marks the transcription as in flight in one step,
+        so concurrent requests cannot all see an empty queue.
+        """
+        with self._cond:
+            self._claim(arrival)
+            tier = self._choose(audio_seconds, queue_depth)
+            self._in_flight += 1
+            return tier
+
+    def _claim(self, arrival):
+        if arrival is not None and arrival.waiting:
+            arrival.waiting = False
+            self._waiting -= 1
+
+    def _choose(self, audio_seconds, queue_depth):
+        if queue_depth is None:
+            queue_depth = self._in_flight + self._waiting
+        # A running background upgrade holds the largest model too
+        queue_depth += self._background
+
+        for tier in reversed(self.tiers):
+            estimate = (queue_depth + 1) * self._rtf[tier] * audio_seconds
+            if estimate <= self.slo_seconds:
+                return tier
+        return self.tiers[0]
+
+    def begin_background(self):
+        """Marks a background re-transcription as running."""
+        with self._cond:
+            self._background += 1
+
+    def end(self, tier, audio_seconds, elapsed, background=False):
+        """Marks a transcription as finished and updates the tier's RTF estimate."""
+        with self._cond:
+            if background:
+                self._background = max(0, self._background - 1)
+            else:
+                self._in_flight = max(0, self._in_flight - 1)
+            self._served[tier] = self._served.get(tier, 0) + 1
+            if audio_seconds > 0:
+                measured = elapsed / audio_seconds
+                previous = self._rtf.get(tier, FALLBACK_RTF)
+                self._rtf[tier] = (1 - EWMA_ALPHA) * previous + EWMA_ALPHA * measured
+            self._cond.notify_all()
+
+    def wait_for_idle(self, timeout=None):
+        """Blocks until no foreground transcription is running or waiting. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._in_flight == 0 and self._waiting == 0, timeout=timeout)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "background": self._background,
+                "slo_seconds": self.slo_seconds,
+                "rtf": {t: round(v, 3) for t, v in self._rtf.items()},
+                "served": dict(self._served),
+            }
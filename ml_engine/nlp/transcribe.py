@@ -6,19 +6,169 @@ Description: Uses OpenAI Whisper to transcribe and translate audio into English
 """
 
 import whisper
+import torch
 import os
+import time
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from .tiering import TierPolicy
 
 # Suppress technical warnings to keep the console clean
 warnings.filterwarnings("ignore")
 
-# Load the model globally so it stays in memory (speeds up your app)
-# 'base' is used for a good balance of speed and multilingual accuracy.
-print("⏳ Loading Whisper Model... (The first time takes 1-2 minutes)")
-_MODEL = whisper.load_model("base")
-print("✅ Whisper Model Loaded.")
+# Model sizes kept in memory, smallest -> largest.
+# 'base' is the default for a good balance of speed and multilingual accuracy;
+# 'tiny' is the fallback when the queue is too long to meet the latency SLO.
+WHISPER_TIERS = ["tiny", "base"]
+DEFAULT_TIER = "base"
+LATENCY_SLO_SECONDS = 8.0
+
+# Opt-in CPU int8 mode: dynamic quantization of every Linear layer.
+# Enable with LIFELINE_WHISPER_INT8=1 (compare with ml_engine/scripts/benchmark_quantized_whisper.py).
+QUANTIZE_INT8 = os.getenv("LIFELINE_WHISPER_INT8", "0") == "1"
+
+_MODELS = {}
+_MODEL_LOCKS = {}  # Whisper installs per-call decoding hooks, so each model runs one call at a time
+_LOAD_LOCK = threading.Lock()
+
+POLICY = TierPolicy(WHISPER_TIERS, LATENCY_SLO_SECONDS)
+
+# Language detection is skipped when a hint is given; these counters measure the saving
+_LANGUAGE_STATS = {"detections": 0, "detection_seconds": 0.0, "hinted": 0, "hints_rejected": 0}
+_STATS_LOCK = threading.Lock()
 
-def transcribe_audio(file_path):
+# A detected language is only worth remembering for a patient above this probability
+LANGUAGE_MIN_PROBABILITY = 0.8
+# A hinted decode scoring below this (mean segment avg_logprob) is redone with detection
+HINT_MIN_AVG_LOGPROB = -1.0
+
+# Background re-transcriptions with the largest tier run one at a time. Each queued
+# upgrade holds its decoded audio, so past MAX_PENDING_UPGRADES new ones are skipped,
+# and one that cannot get an idle model within UPGRADE_MAX_WAIT_SECONDS is dropped.
+MAX_PENDING_UPGRADES = 8
+UPGRADE_MAX_WAIT_SECONDS = 120
+_UPGRADE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper-upgrade")
+_pending_upgrades = 0
+_UPGRADE_LOCK = threading.Lock()
+
+
+def _as_plain_linear(module):
+    """
+    Swaps Whisper's Linear subclass for torch.nn.Linear (sharing the weights)
+    so quantize_dynamic recognises the layers.
+    """
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+            plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain.weight = child.weight
+            plain.bias = child.bias
+            setattr(module, name, plain)
+        else:
+            _as_plain_linear(child)
+    return module
+
+
+def quantize_int8(model):
+    """Returns a CPU copy of the model with int8 dynamically quantized Linear layers."""
+    model = _as_plain_linear(model.cpu())
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def get_model(tier=DEFAULT_TIER, quantized=None):
+    """Loads a Whisper model size (float or int8) into memory ONLY once."""
+    if quantized is None:
+        quantized = QUANTIZE_INT8
+    key = (tier, quantized)
+    with _LOAD_LOCK:
+        if key not in _MODELS:
+            label = f"{tier}-int8" if quantized else tier
+            print(f"⏳ Loading Whisper '{label}' Model... (The first time takes 1-2 minutes)")
+            if quantized:
+                _MODELS[key] = quantize_int8(whisper.load_model(tier, device="cpu"))
+            else:
+                _MODELS[key] = whisper.load_model(tier)
+            _MODEL_LOCKS[key] = threading.Lock()
+            print(f"✅ Whisper '{label}' Model Loaded.")
+    return _MODELS[key]
+
+
+# Load every tier globally so they stay in memory (a surge should not pay load time)
+for _tier in WHISPER_TIERS:
+    get_model(_tier)
+_MODEL = get_model(DEFAULT_TIER)
+
+
+def _translate(audio, tier=DEFAULT_TIER, quantized=None, language=None):
+    """One translate pass; returns Whisper's full result dict (text and segments)."""
+    if quantized is None:
+        quantized = QUANTIZE_INT8
+    model = get_model(tier, quantized)
+    with _MODEL_LOCKS[(tier, quantized)]:
+        # task="translate" ensures non-English speech is converted to English text.
+        # This is the "secret sauce" for the multilingual requirement.
+        # int8 kernels are CPU-only, so half precision never applies to them.
+        return model.transcribe(audio, task="translate", language=language,
+                                fp16=not quantized and model.device.type == "cuda")
+
+
+def run_model(audio, tier=DEFAULT_TIER, quantized=None, language=None):
+    """
+    Runs one translate pass on a file path or a 16 kHz float32 array and returns the text.
+    Passing `language` (a Whisper code such as 'hi') skips language detection.
+    """
+    return _translate(audio, tier, quantized, language).get("text", "").strip()
+
+
+def _mean_avg_logprob(result):
+    segments = result.get("segments") or []
+    if not segments:
+        return None
+    return sum(s["avg_logprob"] for s in segments) / len(segments)
+
+
+def detect_language(audio, tier=DEFAULT_TIER, quantized=None):
+    """
+    Runs Whisper's language detection on the first 30 s of a 16 kHz array.
+    Returns (language code, probability).
+    """
+    if quantized is None:
+        quantized = QUANTIZE_INT8
+    model = get_model(tier, quantized)
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels).to(model.device)
+    with _MODEL_LOCKS[(tier, quantized)]:
+        _, probs = model.detect_language(mel)
+    language = max(probs, key=probs.get)
+    return language, float(probs[language])
+
+
+def normalize_language(language):
+    """Returns a Whisper language code for a hint, or None if it is not recognised."""
+    if not language:
+        return None
+    language = language.strip().lower()
+    if language in whisper.tokenizer.LANGUAGES:
+        return language
+    return whisper.tokenizer.TO_LANGUAGE_CODE.get(language)
+
+
+def get_language_stats():
+    """
+    Detection runs, their cost, and the estimated time saved by language hints.
+    "hinted" counts hints that were kept; "hints_rejected" ones that scored too
+    low and were re-detected (those saved nothing).
+    """
+    with _STATS_LOCK:
+        stats = dict(_LANGUAGE_STATS)
+    mean_detection = stats["detection_seconds"] / stats["detections"] if stats["detections"] else 0.0
+    stats["mean_detection_seconds"] = round(mean_detection, 4)
+    stats["estimated_seconds_saved"] = round(stats["hinted"] * mean_detection, 2)
+    stats["detection_seconds"] = round(stats["detection_seconds"], 2)
+    return stats
+
+
+def transcribe_audio(file_path, tier=DEFAULT_TIER):
     """
     Takes an audio file and returns translated English text.
     Automatically handles English, Hindi, and Tamil.
@@ -27,14 +177,180 @@ def transcribe_audio(file_path):
         return {"error": f"Audio file not found at: {file_path}"}
 
     try:
-        # task="translate" ensures non-English speech is converted to English text.
-        # This is the "secret sauce" for the multilingual requirement.
-        result = _MODEL.transcribe(file_path, task="translate")
-        
+        return run_model(file_path, tier)
+    except Exception as e:
+        return {"error": f"Transcription failed: {str(e)}"}
+
+
+# Single-segment decodes that look like hallucination are retried with transcribe()'s fallbacks
+BATCH_MAX_COMPRESSION_RATIO = 2.4
+BATCH_MIN_AVG_LOGPROB = -1.0
+
+
+def transcribe_batch(audios, tier=DEFAULT_TIER, language=None, quantized=None):
+    """
+    Translates several 16 kHz float32 arrays, decoding clips of up to 30 s in a
+    single batched forward pass. Longer clips (and batched results that fail
+    Whisper's usual quality thresholds) go through transcribe() one by one.
+
+    Returns a list of {"text", "language"} or {"error"} dicts, in input order.
+    """
+    if quantized is None:
+        quantized = QUANTIZE_INT8
+    model = get_model(tier, quantized)
+    language = normalize_language(language)
+    results = [None] * len(audios)
+
+    short = [i for i, audio in enumerate(audios) if len(audio) <= whisper.audio.N_SAMPLES]
+    if short:
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audios[i]), model.dims.n_mels) for i in short
+        ]).to(model.device)
+        options = whisper.DecodingOptions(
+            task="translate", language=language, fp16=not quantized and model.device.type == "cuda"
+        )
+        try:
+            with _MODEL_LOCKS[(tier, quantized)]:
+                decoded = whisper.decode(model, mel, options)
+        except Exception as e:
+            decoded = [None] * len(short)
+            print(f"⚠️ Batched decode failed, falling back to single clips: {e}")
+
+        for i, result in zip(short, decoded):
+            if result is None or result.compression_ratio > BATCH_MAX_COMPRESSION_RATIO \
+                    or result.avg_logprob < BATCH_MIN_AVG_LOGPROB:
+                continue
+            results[i] = {"text": result.text.strip(), "language": result.language}
+
+    for i, audio in enumerate(audios):
+        if results[i] is not None:
+            continue
+        try:
+            clip_language = language or detect_language(audio, tier, quantized)[0]
+            results[i] = {"text": run_model(audio, tier, quantized, clip_language), "language": clip_language}
+        except Exception as e:
+            results[i] = {"error": f"Transcription failed: {str(e)}"}
+
+    return results
+
+
+def transcribe_adaptive(file_path, queue_depth=None, on_upgrade=None, language=None, arrival=None):
+    """
+    Transcribes with the model tier chosen by the load policy.
+
+    Returns {"text", "tier", "language", "language_probability", "language_hinted",
+    "upgrade_scheduled"} or an error dict. A valid `language` hint skips the
+    detection pass; if the hinted decode scores below HINT_MIN_AVG_LOGPROB the
+    note is redone with detection (language_hinted is then False).
+    language_probability is None for hinted notes.
+    `arrival` is the request's POLICY.arrive() handle, if it was counted as waiting.
+    If a smaller tier was used and `on_upgrade` is given, the note is
+    re-transcribed with the largest tier once no foreground work is running,
+    and `on_upgrade(text, tier)` is called with the result (text None if the
+    upgrade was dropped).
+    """
+    if not os.path.exists(file_path):
+        return {"error": f"Audio file not found at: {file_path}"}
+
+    try:
+        # Decode once into memory so the background upgrade outlives the temp file
+        audio = whisper.load_audio(file_path)
+    except Exception as e:
+        return {"error": f"Transcription failed: {str(e)}"}
+
+    language = normalize_language(language)
+    language_hinted = language is not None
+
+    audio_seconds = len(audio) / whisper.audio.SAMPLE_RATE
+    tier = POLICY.start(audio_seconds, queue_depth, arrival)
+    start = time.perf_counter()
+    language_probability = None
+    try:
+        result = None
+        if language_hinted:
+            result = _translate(audio, tier, language=language)
+            score = _mean_avg_logprob(result)
+            if score is not None and score < HINT_MIN_AVG_LOGPROB:
+                # The stored language may be wrong (e.g. learned from a noisy note): check it
+                detected, language_probability = _detect_timed(audio, tier)
+                language_hinted = False
+                if detected != language:
+                    language = detected
+                    result = None
+            # Only kept hints skipped detection, so only they count towards the time saved
+            with _STATS_LOCK:
+                _LANGUAGE_STATS["hinted" if language_hinted else "hints_rejected"] += 1
+        else:
+            language, language_probability = _detect_timed(audio, tier)
+        if result is None:
+            result = _translate(audio, tier, language=language)
         text = result.get("text", "").strip()
-        return text
     except Exception as e:
         return {"error": f"Transcription failed: {str(e)}"}
+    finally:
+        POLICY.end(tier, audio_seconds, time.perf_counter() - start)
+
+    upgrade_scheduled = False
+    if tier != POLICY.top_tier and on_upgrade is not None:
+        upgrade_scheduled = _schedule_upgrade(audio, on_upgrade, language)
+
+    return {
+        "text": text,
+        "tier": tier,
+        "language": language,
+        "language_probability": language_probability,
+        "language_hinted": language_hinted,
+        "upgrade_scheduled": upgrade_scheduled
+    }
+
+
+def _detect_timed(audio, tier):
+    # Detect explicitly (same work transcribe() would do) so its cost is measured
+    detect_start = time.perf_counter()
+    detected = detect_language(audio, tier)
+    with _STATS_LOCK:
+        _LANGUAGE_STATS["detections"] += 1
+        _LANGUAGE_STATS["detection_seconds"] += time.perf_counter() - detect_start
+    return detected
+
+
+def _schedule_upgrade(audio, on_upgrade, language):
+    """Queues a background upgrade unless the backlog is full. Returns True if queued."""
+    global _pending_upgrades
+    with _UPGRADE_LOCK:
+        if _pending_upgrades >= MAX_PENDING_UPGRADES:
+            return False
+        _pending_upgrades += 1
+    _UPGRADE_EXECUTOR.submit(_upgrade, audio, on_upgrade, language)
+    return True
+
+
+def _upgrade(audio, on_upgrade, language=None):
+    """Re-transcribes a note with the largest tier when capacity frees up."""
+    global _pending_upgrades
+    try:
+        if not POLICY.wait_for_idle(timeout=UPGRADE_MAX_WAIT_SECONDS):
+            print("⚠️ Background re-transcription dropped: Whisper stayed busy")
+            on_upgrade(None, None)
+            return
+        tier = POLICY.top_tier
+        audio_seconds = len(audio) / whisper.audio.SAMPLE_RATE
+
+        POLICY.begin_background()
+        start = time.perf_counter()
+        try:
+            text = run_model(audio, tier, language=language)
+        except Exception as e:
+            print(f"⚠️ Background re-transcription failed: {e}")
+            on_upgrade(None, None)
+            return
+        finally:
+            POLICY.end(tier, audio_seconds, time.perf_counter() - start, background=True)
+        on_upgrade(text, tier)
+    finally:
+        with _UPGRADE_LOCK:
+            _pending_upgrades -= 1
+
 
 # --- Local Test Logic ---
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+"""
+Script: batch_transcribe.py
+Role: Offline Voice-Note Backlog Processor
+Author: AI Engineer (Member 2)
+Description: Reprocesses a directory (or manifest) of queued voice notes after an
+outage. Audio is decoded in parallel, translated by Whisper in batches, then run
+through extract_symptoms and predict_priority_score. Results are appended to a
+JSONL file, so an interrupted run resumes where it stopped.
+
+Usage:
+  python ml_engine/scripts/batch_transcribe.py backend/temp_audio --output results.jsonl
+  python ml_engine/scripts/batch_transcribe.py manifest.txt --output results.jsonl --batch-size 16
+
+A manifest is a text file with one audio path per line, or a .jsonl file with a
+"path" key per line (plus an optional "age").
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.append(ROOT_DIR)
+
+import whisper
+from ml_engine.nlp.transcribe import DEFAULT_TIER, transcribe_batch
+from ml_engine.nlp.extract import extract_symptoms
+from ml_engine.inference import predict_priority_score
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.m4a', '.ogg', '.webm', '.flac', '.aac', '.opus')
+DEFAULT_AGE = 30  # Same default the voice-only endpoint uses
+
+
+def load_jobs(source):
+    """Returns a list of {"path", "age"} from a directory or a manifest file."""
+    if os.path.isdir(source):
+        return [
+            {"path": os.path.join(source, name), "age": DEFAULT_AGE}
+            for name in sorted(os.listdir(source))
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        ]
+
+    jobs = []
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if source.endswith(".jsonl"):
+                entry = json.loads(line)
+                path, age = entry["path"], entry.get("age", DEFAULT_AGE)
+            else:
+                path, age = line, DEFAULT_AGE
+            if not os.path.isabs(path):
+                path = os.path.join(base_dir, path)
+            jobs.append({"path": path, "age": age})
+    return jobs
+
+
+def load_completed(output_path):
+    """Paths that already have a successful record in the output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial last line from an interrupted run
+            if "error" not in record:
+                done.add(record["path"])
+    return done
+
+
+def decode(path):
+    """Decodes one file to a 16 kHz array. Returns (audio, error)."""
+    try:
+        return whisper.load_audio(path), None
+    except Exception as e:
+        return None, f"Decode failed: {str(e)}"
+
+
+def process_batch(batch, decoded, tier, language):
+    """Transcribes one batch and scores each note. Returns (records, audio_seconds)."""
+    records = [None] * len(batch)
+    ok = []
+    for i, (audio, error) in enumerate(decoded):
+        if error:
+            records[i] = {"path": batch[i]["path"], "error": error}
+        else:
+            ok.append(i)
+
+    audio_seconds = sum(len(decoded[i][0]) for i in ok) / whisper.audio.SAMPLE_RATE
+    transcripts = transcribe_batch([decoded[i][0] for i in ok], tier=tier, language=language)
+
+    for i, transcript in zip(ok, transcripts):
+        job = batch[i]
+        if "error" in transcript:
+            records[i] = {"path": job["path"], "error": transcript["error"]}
+            continue
+        symptoms = extract_symptoms(transcript["text"])
+        records[i] = {
+            "path": job["path"],
+            "transcribed_text": transcript["text"],
+            "language": transcript["language"],
+            "model_tier": tier,
+            "audio_seconds": round(len(decoded[i][0]) / whisper.audio.SAMPLE_RATE, 2),
+            "symptoms": symptoms,
+            "analysis": predict_priority_score({**symptoms, "age": job["age"]})
+        }
+    return records, audio_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-transcribe and triage a backlog of voice notes.")
+    parser.add_argument("source", help="Directory of audio files, or a .txt/.jsonl manifest")
+    parser.add_argument("--output", required=True, help="JSONL file to append results to")
+    parser.add_argument("--batch-size", type=int, default=8, help="Notes per Whisper forward pass")
+    parser.add_argument("--decode-workers", type=int, default=os.cpu_count() or 4,
+                        help="Parallel ffmpeg decoders")
+    parser.add_argument("--tier", default=DEFAULT_TIER, help="Whisper model size")
+    parser.add_argument("--language", default=None, help="Language hint for every note (skips detection)")
+    args = parser.parse_args()
+
+    jobs = load_jobs(args.source)
+    completed = load_completed(args.output)
+    pending = [job for job in jobs if job["path"] not in completed]
+    print(f"🔄 {len(jobs)} notes found, {len(jobs) - len(pending)} already done, {len(pending)} to process.")
+    if not pending:
+        return
+
+    batches = [pending[i:i + args.batch_size] for i in range(0, len(pending), args.batch_size)]
+    done = failed = 0
+    total_audio = 0.0
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.decode_workers) as pool, \
+            open(args.output, "a", encoding="utf-8") as out:
+        # Decode the next batch while Whisper works on the current one
+        next_decode = [pool.submit(decode, job["path"]) for job in batches[0]]
+        for b, batch in enumerate(batches):
+            decoded = [f.result() for f in next_decode]
+            if b + 1 < len(batches):
+                next_decode = [pool.submit(decode, job["path"]) for job in batches[b + 1]]
+
+            records, audio_seconds = process_batch(batch, decoded, args.tier, args.language)
+            for record in records:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                failed += "error" in record
+            out.flush()
+
+            done += len(batch)
+            total_audio += audio_seconds
+            elapsed = time.perf_counter() - start
+            print(f"   {done}/{len(pending)} notes | {done / elapsed:.2f} notes/s | "
+                  f"{total_audio / elapsed:.1f}x real-time | {failed} failed")
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Processed {done} notes ({total_audio:.0f}s of audio) in {elapsed:.1f}s: "
+          f"{done / elapsed:.2f} notes/s, {total_audio / elapsed:.1f}x real-time, {failed} failed.")
+
+
+if __name__ == "__main__":
+    main()
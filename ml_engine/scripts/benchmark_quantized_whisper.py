@@ -0,0 +1,94 @@
+"""
+Script: benchmark_quantized_whisper.py
+Role: Float vs int8 Whisper Benchmark
+Author: AI Engineer (Member 2)
+Description: Runs the bundled test_*.wav / messy_*.wav clips through the float and
+the int8 dynamically quantized model, and reports real-time factor (RTF) and how
+often the extracted symptoms agree.
+
+Usage: python ml_engine/scripts/benchmark_quantized_whisper.py [--tier base]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.append(ROOT_DIR)
+
+import whisper
+from ml_engine.nlp.transcribe import get_model, run_model
+from ml_engine.nlp.extract import extract_symptoms
+
+CLIP_DIR = os.path.join(ROOT_DIR, 'ml_engine/nlp')
+
+
+def find_clips():
+    clips = glob.glob(os.path.join(CLIP_DIR, 'test_*.wav')) + glob.glob(os.path.join(CLIP_DIR, 'messy_*.wav'))
+    return sorted(clips)
+
+
+def run_variant(clips, tier, quantized):
+    """Transcribes every clip with one model variant. Returns {clip: (text, rtf)}."""
+    get_model(tier, quantized)
+    # Warm-up pass so one-off allocation is not charged to the first clip
+    run_model(whisper.load_audio(clips[0]), tier, quantized)
+
+    results = {}
+    for clip in clips:
+        audio = whisper.load_audio(clip)
+        duration = len(audio) / whisper.audio.SAMPLE_RATE
+        start = time.perf_counter()
+        text = run_model(audio, tier, quantized)
+        elapsed = time.perf_counter() - start
+        results[clip] = (text, elapsed / duration if duration else 0.0)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark float vs int8 Whisper on the bundled clips.")
+    parser.add_argument("--tier", default="base", help="Whisper model size (default: base)")
+    args = parser.parse_args()
+
+    clips = find_clips()
+    if not clips:
+        print(f"❌ No test_*.wav / messy_*.wav clips found in {CLIP_DIR}")
+        return
+
+    print(f"🧪 Benchmarking Whisper '{args.tier}' on {len(clips)} clips...")
+    float_results = run_variant(clips, args.tier, quantized=False)
+    int8_results = run_variant(clips, args.tier, quantized=True)
+
+    print(f"\n{'clip':<14}{'float RTF':>11}{'int8 RTF':>10}{'speedup':>9}  symptoms agree")
+    agree_keys = total_keys = exact = 0
+    float_rtf_sum = int8_rtf_sum = 0.0
+    for clip in clips:
+        float_text, float_rtf = float_results[clip]
+        int8_text, int8_rtf = int8_results[clip]
+        float_symptoms = extract_symptoms(float_text)
+        int8_symptoms = extract_symptoms(int8_text)
+
+        matches = sum(float_symptoms[k] == int8_symptoms[k] for k in float_symptoms)
+        agree_keys += matches
+        total_keys += len(float_symptoms)
+        exact += matches == len(float_symptoms)
+        float_rtf_sum += float_rtf
+        int8_rtf_sum += int8_rtf
+
+        speedup = float_rtf / int8_rtf if int8_rtf else 0.0
+        print(f"{os.path.basename(clip):<14}{float_rtf:>11.3f}{int8_rtf:>10.3f}{speedup:>8.2f}x  "
+              f"{matches}/{len(float_symptoms)}")
+        if float_text != int8_text:
+            print(f"   float: {float_text}")
+            print(f"   int8:  {int8_text}")
+
+    n = len(clips)
+    print(f"\n✅ Mean RTF: float {float_rtf_sum / n:.3f}, int8 {int8_rtf_sum / n:.3f} "
+          f"({(float_rtf_sum / int8_rtf_sum) if int8_rtf_sum else 0:.2f}x)")
+    print(f"✅ Symptom agreement: {agree_keys}/{total_keys} keys, {exact}/{n} clips identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Script: rppg_batch_process.py
+Role: Offline Recorded-Video rPPG Batch Processor
+Description: Runs the rPPG engine over recorded videos instead of a live webcam.
+Each file is decoded on a separate thread into a bounded queue while the engine
+consumes frames. The engine always analyses at ANALYSIS_FPS with its usual
+10 s window; it gets the container's per-frame timestamps and resamples them
+onto that grid, so high-frame-rate, variable-frame-rate and wrongly tagged
+recordings (e.g. a 1000 fps header) all get the same analysis window. The BPM
+time series of every file is written as CSV keyed by those timestamps. A
+directory of clips is processed in parallel, one process per file. Existing
+CSVs are skipped, so an interrupted run resumes.
+
+Usage:
+  python rppg_batch_process.py recordings/ --output bpm_series/
+  python rppg_batch_process.py a.mp4 b.mp4 --output bpm_series/ --jobs 4 --estimator sdft
+"""
+
+import argparse
+import csv
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+# Ensure we can import from backend
+try:
+    from backend.rppg_engine import RPPGHeartRateEngine
+except ImportError:
+    sys.path.append(".")
+    from backend.rppg_engine import RPPGHeartRateEngine
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+QUEUE_FRAMES = 64  # Decoded frames buffered ahead of the engine
+ANALYSIS_FPS = 30.0  # Grid the engine resamples onto, whatever the container says
+BUFFER_SECONDS = 10  # Analysis window
+MIN_CONTAINER_FPS, MAX_CONTAINER_FPS = 1.0, 240.0  # Outside this the header is bogus
+
+
+def find_videos(sources):
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths.extend(
+                os.path.join(source, name) for name in sorted(os.listdir(source))
+                if name.lower().endswith(VIDEO_EXTENSIONS)
+            )
+        else:
+            paths.append(source)
+    return paths
+
+
+def output_path_for(path, output_dir):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + ".csv")
+
+
+def decode_frames(cap, fps, frames, stop):
+    """
+    Decoder thread: puts (timestamp_s, frame) into the bounded queue, then None.
+    Timestamps come from the container; frames without one (or going backwards)
+    fall back to the previous timestamp plus one nominal frame period.
+    """
+    if not MIN_CONTAINER_FPS <= fps <= MAX_CONTAINER_FPS:
+        fps = ANALYSIS_FPS
+    last = None
+    try:
+        while not stop.is_set():
+            ok, frame = cap.read()
+            if not ok:
+                break
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if last is not None and timestamp <= last:
+                timestamp = last + 1.0 / fps
+            last = timestamp
+            frames.put((timestamp, frame))
+    finally:
+        frames.put(None)
+
+
+def process_video(path, output_path, estimator="fft", detect_interval=1, every=0.5):
+    """Runs one file through a fresh engine and writes its BPM series. Returns a summary dict."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return {"path": path, "error": "Could not open video"}
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    engine = RPPGHeartRateEngine(buffer_size=int(ANALYSIS_FPS * BUFFER_SECONDS), fps=ANALYSIS_FPS,
+                                 estimator=estimator, detect_interval=detect_interval)
+    frames = queue.Queue(maxsize=QUEUE_FRAMES)
+    stop = threading.Event()
+    decoder = threading.Thread(target=decode_frames, args=(cap, fps, frames, stop), daemon=True)
+
+    rows = []
+    count = 0
+    next_row = 0.0
+    timestamp = 0.0
+    start = time.perf_counter()
+    decoder.start()
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+            timestamp, frame = item
+            bpm = engine.process_frame(frame, timestamp)
+            count += 1
+            if timestamp >= next_row:
+                quality = engine.quality_report()["index"]
+                rows.append((round(timestamp, 3), None if bpm is None else round(bpm, 2),
+                             engine.last_confidence if bpm is not None else None, quality))
+                next_row = timestamp + every
+    finally:
+        stop.set()
+        # Unblock the decoder if it is waiting on a full queue
+        while decoder.is_alive():
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                decoder.join(timeout=0.1)
+        cap.release()
+        engine.close()
+    elapsed = time.perf_counter() - start
+
+    tmp_path = output_path + ".part"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["time_s", "bpm", "confidence", "quality"])
+        writer.writerows(("" if v is None else v for v in row) for row in rows)
+    os.replace(tmp_path, output_path)  # Only complete files count as done
+
+    bpms = [row[1] for row in rows if row[1] is not None and row[2] == 1.0]
+    return {
+        "path": path,
+        "frames": count,
+        "duration_s": round(timestamp, 1),
+        "container_fps": round(fps, 2),
+        "processing_fps": round(count / elapsed, 1) if elapsed else None,
+        "median_bpm": round(float(np.median(bpms)), 1) if bpms else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch rPPG over recorded videos.")
+    parser.add_argument("sources", nargs="+", help="Video files and/or directories of videos")
+    parser.add_argument("--output", required=True, help="Directory for the per-file BPM CSVs")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Files processed in parallel")
+    parser.add_argument("--estimator", choices=RPPGHeartRateEngine.ESTIMATORS, default="fft")
+    parser.add_argument("--detect-interval", type=int, default=1, help="Run FaceMesh every N frames")
+    parser.add_argument("--every", type=float, default=0.5, help="Seconds of video between CSV rows")
+    parser.add_argument("--overwrite", action="store_true", help="Reprocess files that already have a CSV")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    videos = find_videos(args.sources)
+    todo = [p for p in videos if args.overwrite or not os.path.exists(output_path_for(p, args.output))]
+    print(f"🎞️  {len(videos)} videos, {len(videos) - len(todo)} already done, {len(todo)} to process "
+          f"on {min(args.jobs, max(len(todo), 1))} processes")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [
+            pool.submit(process_video, path, output_path_for(path, args.output),
+                        args.estimator, args.detect_interval, args.every)
+            for path in todo
+        ]
+        for future in as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as e:
+                print(f"❌ {e}")
+                continue
+            if "error" in summary:
+                print(f"❌ {summary['path']}: {summary['error']}")
+            else:
+                print(f"✅ {summary['path']}: {summary['frames']} frames ({summary['duration_s']} s @ "
+                      f"{summary['container_fps']} fps) at {summary['processing_fps']} fps, "
+                      f"median {summary['median_bpm']} BPM")
+    print(f"Done in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
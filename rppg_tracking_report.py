@@ -0,0 +1,80 @@
+"""
+Script: rppg_tracking_report.py
+Role: FaceMesh Interval vs Optical-Flow Tracking Report
+Description: Replays recorded face videos through the rPPG engine with FaceMesh
+run every N frames (optical-flow tracking in between) and reports CPU time saved
+and BPM deviation relative to running FaceMesh on every frame.
+
+Usage: python rppg_tracking_report.py clip1.mp4 [clip2.mp4 ...] [--intervals 1 3 5 10]
+"""
+
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Ensure we can import from backend
+try:
+    from backend.rppg_engine import RPPGHeartRateEngine
+except ImportError:
+    sys.path.append(".")
+    from backend.rppg_engine import RPPGHeartRateEngine
+
+
+def read_frames(path):
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames, int(round(fps))
+
+
+def run(frames, fps, interval):
+    """Returns (per-frame BPM list, CPU seconds, engine) for one detect interval."""
+    engine = RPPGHeartRateEngine(fps=fps, detect_interval=interval)
+    bpms = []
+    start = time.process_time()
+    for frame in frames:
+        bpms.append(engine.process_frame(frame))
+    return bpms, time.process_time() - start, engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report CPU saved vs BPM error for landmark tracking.")
+    parser.add_argument("clips", nargs="+", help="Recorded face videos")
+    parser.add_argument("--intervals", type=int, nargs="+", default=[1, 3, 5, 10])
+    args = parser.parse_args()
+
+    intervals = sorted(set([1] + args.intervals))
+    for clip in args.clips:
+        frames, fps = read_frames(clip)
+        if not frames:
+            print(f"❌ Could not read {clip}")
+            continue
+        print(f"\n🎞️  {clip}: {len(frames)} frames @ {fps} fps")
+        print(f"{'N':>4}{'ms/frame':>10}{'CPU saved':>11}{'detections':>12}{'tracked':>9}{'mean |dBPM|':>13}{'max |dBPM|':>12}")
+
+        baseline, baseline_cpu, baseline_engine = run(frames, fps, 1)
+        for interval in intervals:
+            if interval == 1:
+                bpms, cpu, engine = baseline, baseline_cpu, baseline_engine
+            else:
+                bpms, cpu, engine = run(frames, fps, interval)
+
+            diffs = [abs(a - b) for a, b in zip(bpms, baseline) if a is not None and b is not None]
+            mean_diff = np.mean(diffs) if diffs else float("nan")
+            max_diff = np.max(diffs) if diffs else float("nan")
+            saved = 1 - cpu / baseline_cpu if baseline_cpu else 0.0
+            print(f"{interval:>4}{cpu / len(frames) * 1000:>10.2f}{saved:>10.0%}{engine.detections:>12}{engine.tracked_frames:>9}"
+                  f"{mean_diff:>13.2f}{max_diff:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
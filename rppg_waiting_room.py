@@ -0,0 +1,64 @@
+"""
+Script: rppg_waiting_room.py
+Role: Multi-Face rPPG Demo (Shared Waiting-Room Camera)
+Description: Runs MultiFaceRPPGEngine on a webcam or a recorded video and draws
+each subject's id and heart rate above their forehead.
+
+Usage: python rppg_waiting_room.py [video.mp4] [--faces 6]
+"""
+
+import argparse
+import sys
+
+import cv2
+
+# Ensure we can import from backend
+try:
+    from backend.rppg_engine import MultiFaceRPPGEngine
+except ImportError:
+    sys.path.append(".")
+    from backend.rppg_engine import MultiFaceRPPGEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Heart rates for every face in one camera stream.")
+    parser.add_argument("source", nargs="?", default="0", help="Video file, or webcam index (default 0)")
+    parser.add_argument("--faces", type=int, default=6, help="Most faces tracked at once")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(int(args.source) if args.source.isdigit() else args.source)
+    if not cap.isOpened():
+        print(f"Error: Could not open {args.source}.")
+        return
+    fps = int(round(cap.get(cv2.CAP_PROP_FPS) or 30))
+    engine = MultiFaceRPPGEngine(max_faces=args.faces, fps=fps)
+    print("Press 'q' to quit.")
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        readings = engine.process_frame(frame)
+        for subject_id, reading in readings.items():
+            x0, y0, x1, y1 = reading["bbox"]
+            if reading["bpm"] is None:
+                text, color = f"#{subject_id} calibrating", (0, 0, 255)
+            elif reading["confidence"] < 1.0:
+                text, color = f"#{subject_id} ~{reading['bpm']:.0f} BPM", (0, 200, 255)
+            else:
+                text, color = f"#{subject_id} {reading['bpm']:.0f} BPM", (0, 255, 0)
+            cv2.rectangle(frame, (x0, y0), (x1, y1), color, 1)
+            cv2.putText(frame, text, (x0, max(15, y0 - 8)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+        cv2.imshow("rPPG Waiting Room", frame)
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            break
+
+    cap.release()
+    engine.close()
+    cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,16 @@ import numpy as np
 import cv2
 import time
 import uuid
+import struct
 
 BASE_URL = "http://127.0.0.1:8000"
 WS_URL = "ws://127.0.0.1:8000/vitals/heartrate/ws"
+SIGNAL_WS_URL = "ws://127.0.0.1:8000/vitals/signal/ws"
+
+# Binary frame header (backend/app/services/frame_protocol.py): seq, timestamp, format, width
+FRAME_HEADER = struct.Struct("<IdBxH")
+FORMAT_ENCODED = 0
+FORMAT_BGR24 = 1
 
 # Test Data
 USER_DATA_EN = {
@@ -131,6 +138,131 @@ async def test_05_database_bpm_persistence():
         assert data["heart_rate"] == 75.5
         print("\n✅ Database Persistence Passed (Seeded)")
 
+async def _register(client):
+    reg = await client.post(f"{BASE_URL}/register", params=USER_DATA_EN)
+    return reg.json()["token"]
+
+@pytest.mark.asyncio
+async def test_06_rppg_binary_websocket():
+    """Verify binary frames (JPEG and raw 1080p BGR24) echo seq/timestamp, and bad frames get an error reply."""
+    async with httpx.AsyncClient() as client:
+        token = await _register(client)
+
+    jpg = cv2.imencode('.jpg', np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8))[1].tobytes()
+    raw = np.random.randint(0, 255, (1080, 1920, 3), dtype=np.uint8).tobytes()
+
+    async with websockets.connect(f"{WS_URL}?token={token}", max_size=None) as websocket:
+        for seq in range(3):
+            await websocket.send(FRAME_HEADER.pack(seq, (seq + 1) / 30, FORMAT_ENCODED, 0) + jpg)
+            data = json.loads(await websocket.recv())
+            assert data["seq"] == seq
+            assert data["timestamp"] == (seq + 1) / 30
+            assert "bpm" in data and "processing_fps" in data
+
+        # Timestamp 0 means untimed; NaN is rejected with the seq echoed
+        await websocket.send(FRAME_HEADER.pack(3, 0.0, FORMAT_ENCODED, 0) + jpg)
+        data = json.loads(await websocket.recv())
+        assert data["seq"] == 3 and data["timestamp"] is None and "error" not in data
+        await websocket.send(FRAME_HEADER.pack(4, float("nan"), FORMAT_ENCODED, 0) + jpg)
+        data = json.loads(await websocket.recv())
+        assert data["seq"] == 4 and "error" in data
+
+        await websocket.send(FRAME_HEADER.pack(10, 0.5, FORMAT_BGR24, 1920) + raw)
+        data = json.loads(await websocket.recv())
+        assert data["seq"] == 10
+        assert "error" not in data, data.get("error")
+
+        # Payload not a whole number of rows: error reply, connection stays usable
+        await websocket.send(FRAME_HEADER.pack(11, 0.6, FORMAT_BGR24, 1920) + raw[:-1])
+        data = json.loads(await websocket.recv())
+        assert data["seq"] == 11
+        assert "error" in data
+
+        await websocket.send(FRAME_HEADER.pack(12, 0.7, FORMAT_ENCODED, 0) + jpg)
+        assert json.loads(await websocket.recv())["seq"] == 12
+    print("\n✅ Binary WebSocket Protocol Passed")
+
+@pytest.mark.asyncio
+async def test_07_edge_signal_websocket():
+    """Verify edge mode: client-side ROI means of a 72 BPM pulse come back as ~72 BPM."""
+    async with httpx.AsyncClient() as client:
+        token = await _register(client)
+
+    fps, bpm = 30.0, 72.0
+    t = np.arange(int(20 * fps)) / fps
+    green = 120 + 0.8 * np.sin(2 * np.pi * bpm / 60 * t) + np.random.default_rng(0).normal(0, 0.1, len(t))
+
+    async with websockets.connect(f"{SIGNAL_WS_URL}?token={token}") as websocket:
+        data = None
+        for start in range(0, len(t), 30):
+            batch = range(start, min(start + 30, len(t)))
+            if start % 60:
+                # Packed float64 (t, R, G, B) rows
+                message = b"".join(struct.pack("<4d", t[i], 0.0, green[i], 0.0) for i in batch)
+            else:
+                message = json.dumps({"samples": [[t[i], green[i]] for i in batch]})
+            await websocket.send(message)
+            data = json.loads(await websocket.recv())
+            assert data["accepted"] == len(batch)
+            await asyncio.sleep(0.1)  # BPM updates are batched on the server's analysis tick
+
+        assert data["bpm"] is not None
+        assert abs(data["bpm"] - bpm) < 5
+        assert data["confidence"] == 1.0
+
+        # Rows must be (t, green) or (t, R, G, B)
+        await websocket.send(json.dumps({"samples": [[100.0, 1.0, 2.0]]}))
+        assert "error" in json.loads(await websocket.recv())
+
+        # Oversized batches are refused before they reach the engine
+        await websocket.send(json.dumps({"samples": [[100.0 + i / 30, 1.0] for i in range(301)]}))
+        assert "error" in json.loads(await websocket.recv())
+    print(f"\n✅ Edge Mode Passed (BPM={data['bpm']:.1f})")
+
+@pytest.mark.asyncio
+async def test_08_triage_job_api():
+    """Verify the async triage job API: submit, poll to completion, and subscribe over WebSocket."""
+    async with httpx.AsyncClient() as client:
+        form = {"age": "45", "heart_rate": "88", "manual_symptoms": "chest_pain,dizziness"}
+        resp = await client.post(f"{BASE_URL}/triage/jobs", data=form)
+        assert resp.status_code == 202
+        job = resp.json()
+        assert job["status"] == "accepted"
+
+        ws_url = BASE_URL.replace("http", "ws") + job["ws_url"]
+        async with websockets.connect(ws_url) as websocket:
+            states = [json.loads(await websocket.recv())["state"]]
+            if states[-1] not in ("done", "failed"):
+                states.append(json.loads(await websocket.recv())["state"])
+        assert states[-1] == "done"
+
+        for _ in range(50):
+            polled = (await client.get(f"{BASE_URL}{job['status_url']}")).json()
+            if polled["state"] in ("done", "failed"):
+                break
+            await asyncio.sleep(0.2)
+        assert polled["state"] == "done"
+        assert "score" in polled["result"]["triage"]
+
+        resp = await client.get(f"{BASE_URL}/triage/jobs/{uuid.uuid4().hex}")
+        assert resp.status_code == 404
+    print("\n✅ Triage Job API Passed")
+
+@pytest.mark.asyncio
+async def test_09_vitals_stats():
+    """Verify /vitals/stats reports per-worker session limits, edge sessions and the vitals write queue."""
+    async with httpx.AsyncClient() as client:
+        resp = await client.get(f"{BASE_URL}/vitals/stats")
+        assert resp.status_code == 200
+        stats = resp.json()
+        assert len(stats["workers"]) >= 1
+        for key in ("live", "created", "evicted_idle", "evicted_lru", "rejected", "restarts"):
+            assert key in stats["totals"]
+        assert stats["edge_sessions"]["live"] <= stats["edge_sessions"]["max"]
+        assert stats["vitals_writes"]["durability"] in ("batched", "immediate")
+        assert stats["vitals_writes"]["pending"] >= 0
+    print("\n✅ Vitals Stats Passed")
+
 if __name__ == "__main__":
     # Manual runner if pytest not used directly
     # But usually ran via `pytest test_suite_comprehensive.py`